@@ -0,0 +1,75 @@
+"""
+Compare parsing non-UTF-8 pages with and without the encoding pre-scan done
+by ``activesoup.html.resolve``.
+
+The baseline hands the raw bytes to ``html5lib``, as ``resolve`` used to, and
+leaves it to sniff and decode the page itself - without the charset from the
+``Content-Type`` header, which it never saw. For comparison, the benchmark
+also times ``html5lib`` when it is given the header's charset.
+
+Run with:
+
+.. code-block::
+
+    python benchmarks/bench_charset.py
+"""
+
+import timeit
+
+import html5lib
+import requests
+
+import activesoup.html
+
+_ROW = "<tr><td>Café {n}</td><td>Ñandú – {n}</td><td>€{n}.00</td></tr>\n"
+_PAGES = {
+    "windows-1252 (header)": ("cp1252", "text/html; charset=windows-1252", ""),
+    "windows-1252 (meta)": ("cp1252", "text/html", '<meta charset="windows-1252">'),
+    "shift_jis (header)": ("shift_jis", "text/html; charset=Shift_JIS", ""),
+}
+
+
+def _response(encoding: str, content_type: str, meta: str) -> requests.Response:
+    rows = "".join(_ROW.format(n=n) for n in range(2000))
+    if encoding == "shift_jis":
+        rows = rows.replace("Café", "日本").replace("Ñandú –", "東京").replace("€", "¥")
+    page = f"<html><head>{meta}</head><body><table>{rows}</table></body></html>"
+
+    response = requests.Response()
+    response._content = page.encode(encoding)
+    response.headers["Content-Type"] = content_type
+    return response
+
+
+def _best_of(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main(repeat: int = 5) -> None:
+    for name, args in _PAGES.items():
+        response = _response(*args)
+        transport_encoding = args[0] if "header" in name else None
+        sniffed = _best_of(
+            lambda: activesoup.html._strip_namespace(html5lib.parse(response.content)),
+            repeat,
+        )
+        told = _best_of(
+            lambda: activesoup.html._strip_namespace(
+                html5lib.parse(response.content, transport_encoding=transport_encoding)
+            ),
+            repeat,
+        )
+        prescan = _best_of(
+            lambda: activesoup.html.resolve(None, response),  # type: ignore
+            repeat,
+        )
+        print(
+            f"{name:<24} {len(response.content) / 1024:5.0f} KiB"
+            f"   html5lib sniffing: {sniffed * 1000:6.1f} ms"
+            f"   html5lib with header charset: {told * 1000:6.1f} ms"
+            f"   pre-scan: {prescan * 1000:6.1f} ms ({sniffed / prescan:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
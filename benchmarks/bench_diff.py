@@ -0,0 +1,71 @@
+"""
+Time change detection between two versions of a large page.
+
+Compares:
+
+* hashing a page (done once per page, the first time a fingerprint or diff
+  is needed)
+* diffing two pages whose hashes are already known, when one row changed
+* the naive alternative: extracting the text of every row from both pages,
+  and comparing
+
+Run with:
+
+.. code-block::
+
+    python benchmarks/bench_diff.py
+"""
+
+import timeit
+
+import requests
+
+import activesoup
+from activesoup import changes, html
+
+_ROW = '<tr><td class="name">Item {n}</td><td class="price">{price}</td></tr>'
+
+
+def _page(rows: int, changed: int) -> activesoup.Response:
+    body = "".join(
+        _ROW.format(n=n, price="9.99" if n == changed else f"{n}.00")
+        for n in range(rows)
+    )
+    response = requests.Response()
+    response._content = f"<html><body><table>{body}</table></body></html>".encode()
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    return activesoup.Driver().content_resolver.resolve(response)
+
+
+def _naive(old, new) -> list:
+    old_rows = [r.text_content() for r in old.find_all("tr")]
+    new_rows = [r.text_content() for r in new.find_all("tr")]
+    return [i for i, (o, n) in enumerate(zip(old_rows, new_rows)) if o != n]
+
+
+def main(repeat: int = 5) -> None:
+    for rows in (1000, 10000):
+        old, new = _page(rows, -1), _page(rows, rows // 2)
+        hashing = min(
+            timeit.repeat(
+                lambda: changes.subtree_hashes(old.etree()), number=1, repeat=repeat
+            )
+        )
+        old.fingerprint(), new.fingerprint()
+        diffing = min(
+            timeit.repeat(lambda: html.diff(old, new), number=1, repeat=repeat)
+        )
+        # Text is cached per page, so each run needs freshly parsed pages
+        pages = [(_page(rows, -1), _page(rows, rows // 2)) for _ in range(repeat)]
+        naive = min(
+            timeit.repeat(lambda: _naive(*pages.pop()), number=1, repeat=repeat)
+        )
+        print(
+            f"{rows:>6} rows   hash page: {hashing * 1000:7.1f}ms"
+            f"   diff (hashed): {diffing * 1000:6.2f}ms"
+            f"   naive text compare: {naive * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
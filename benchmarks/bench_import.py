@@ -0,0 +1,77 @@
+"""
+Measure how long it takes to start using ``activesoup``, with
+``python -X importtime``.
+
+Each scenario is run in a fresh interpreter, several times, and the best
+run is reported - along with the modules which contributed most to it. The
+scenarios are:
+
+* ``import activesoup`` on its own, which should load next to nothing
+* creating a ``Driver``, which loads ``requests``
+* creating a ``Driver`` and parsing an HTML page, which also loads
+  ``html5lib``
+
+Run with:
+
+.. code-block::
+
+    python benchmarks/bench_import.py
+"""
+
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+_SCENARIOS = {
+    "import activesoup": "import activesoup",
+    "create a Driver": "import activesoup; activesoup.Driver()",
+    "parse a page": (
+        "import activesoup, requests\n"
+        "r = requests.Response()\n"
+        "r._content = b'<html><body><p>hi</p></body></html>'\n"
+        "r.headers['Content-Type'] = 'text/html'\n"
+        "d = activesoup.Driver()\n"
+        "d.content_resolver.resolve(r)\n"
+    ),
+}
+
+
+def _importtime(code: str) -> Dict[str, int]:
+    """Cumulative import time (in microseconds) of every top-level import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            times[name.strip()] = times.get(name.strip(), 0) + int(cumulative)
+    return times
+
+
+def _best_of(code: str, repeat: int) -> Tuple[int, List[Tuple[str, int]]]:
+    # Modules imported while Python starts up aren't ours
+    startup = set(_importtime("pass"))
+    runs = [
+        {m: t for m, t in _importtime(code).items() if m not in startup}
+        for _ in range(repeat)
+    ]
+    best = min(runs, key=lambda t: sum(t.values()))
+    return sum(best.values()), sorted(best.items(), key=lambda kv: -kv[1])
+
+
+def main(repeat: int = 5) -> None:
+    for name, code in _SCENARIOS.items():
+        total, modules = _best_of(code, repeat)
+        print(f"{name}: {total / 1000:.1f}ms")
+        for module, t in modules[:5]:
+            print(f"    {module:<30} {t / 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Measure page load (parse) throughput against a fixed corpus of pages, served
+from a cassette (see :py:mod:`activesoup.cassette`) so that there is no
+network latency or variation between runs.
+
+The first run records the cassette from the given URLs; later runs replay it:
+
+.. code-block::
+
+    python benchmarks/bench_replay.py /tmp/corpus https://example.com/ https://example.org/
+"""
+
+import os
+import sys
+import time
+from typing import List
+
+import activesoup
+from activesoup import cassette
+
+
+def main(path: str, urls: List[str], rounds: int = 10) -> None:
+    if not os.path.exists(path):
+        d = activesoup.Driver()
+        with cassette.record(d, path):
+            for url in urls:
+                d.get(url)
+
+    d = activesoup.Driver(history_depth=1)
+    cassette.replay(d, path)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for url in urls:
+            d.get(url)
+    elapsed = time.perf_counter() - start
+
+    pages = rounds * len(urls)
+    print(f"{pages} pages in {elapsed:.2f}s ({pages / elapsed:.1f} pages/s)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(f"usage: {sys.argv[0]} CASSETTE URL [URL ...]")
+    main(sys.argv[1], sys.argv[2:])
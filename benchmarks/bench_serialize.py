@@ -0,0 +1,74 @@
+"""
+Compare serializing a large page with ``activesoup.serialize`` against
+``xml.etree.ElementTree.tostring``, which ``BoundTag.html`` used to call.
+
+For each approach, the benchmark reports the best time out of several runs,
+and the peak memory allocated while serializing (measured separately, with
+``tracemalloc``). ``write_html`` streams the page to a file, so its peak
+memory should stay flat however big the page is.
+
+Run with:
+
+.. code-block::
+
+    python benchmarks/bench_serialize.py
+"""
+
+import os
+import tempfile
+import timeit
+import tracemalloc
+from xml.etree.ElementTree import tostring
+
+import requests
+
+import activesoup
+
+_ROW = (
+    '<tr class="row"><td>{n}</td><td><a href="/item/{n}">Item &amp; {n}</a></td></tr>\n'
+)
+
+
+def _page(rows: int) -> activesoup.Response:
+    body = "".join(_ROW.format(n=n) for n in range(rows))
+    response = requests.Response()
+    response._content = f"<html><body><table>{body}</table></body></html>".encode()
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    return activesoup.Driver().content_resolver.resolve(response)
+
+
+def _peak_memory(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(repeat: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "page.html")
+
+        def write_html():
+            with open(path, "wb") as f:
+                page.write_html(f)
+
+        for rows in (2000, 20000):
+            page = _page(rows)
+            approaches = {
+                "ElementTree.tostring": lambda: tostring(page.etree()),
+                "BoundTag.html": page.html,
+                "BoundTag.write_html": write_html,
+            }
+            print(f"{rows} rows:")
+            for name, fn in approaches.items():
+                seconds = min(timeit.repeat(fn, number=1, repeat=repeat))
+                peak = _peak_memory(fn)
+                print(
+                    f"    {name:<22} {seconds * 1000:7.1f}ms {peak / 1024:9.0f}KiB peak"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,27 @@
-from .response import Response
-from .driver import Driver
+import sys
+from typing import TYPE_CHECKING
 
 __all__ = ["Response", "Driver"]
 
 __version__ = "0.3.1"
+
+# Importing ``activesoup`` should be cheap: the public names (and ``requests``
+# along with them) are only loaded the first time they're used.
+if sys.version_info >= (3, 7) and not TYPE_CHECKING:
+
+    def __getattr__(name):
+        if name == "Response":
+            from .response import Response as value
+        elif name == "Driver":
+            from .driver import Driver as value
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
+
+else:  # module __getattr__ needs PEP 562
+    from .response import Response
+    from .driver import Driver
@@ -0,0 +1,243 @@
+"""
+Record and replay HTTP traffic, for deterministic offline tests and
+benchmarks of code built on :py:class:`activesoup.Driver`.
+
+A *cassette* is a directory holding an index of the requests that were made
+(``index.jsonl``) and the bodies of their responses (``bodies.bin``). To
+record one, mount a :py:class:`RecordingAdapter` on the ``Driver``'s session
+(:py:func:`record` does this for you) and use the ``Driver`` as normal:
+
+.. code-block::
+
+    from activesoup import cassette
+
+    d = activesoup.Driver()
+    with cassette.record(d, "fixtures/login-flow"):
+        d.get("https://example.com/login").form.submit({"user": "me"})
+
+Later, the same requests can be answered from the cassette, with no network
+access at all:
+
+.. code-block::
+
+    d = activesoup.Driver()
+    cassette.replay(d, "fixtures/login-flow")
+    d.get("https://example.com/login").form.submit({"user": "me"})
+
+Each hop of a redirect is recorded separately, and requests are matched on
+their method, URL and body - so two different form submissions to the same
+URL get their own responses. Bodies which are streamed (e.g. multipart
+uploads) can't be inspected without consuming them, so those requests are
+matched on method and URL alone. If the same request is made several times
+while recording, the replay serves the responses back in the same order
+(repeating the last one once they run out).
+
+On replay, response bodies are read from a memory-mapped ``bodies.bin``, so
+a large cassette can be opened instantly, and only the bodies that are used
+are paged in.
+
+Replayed responses keep the time they were recorded as their ``captured_at``
+(see :py:meth:`activesoup.Driver.add_response_hook`), so that archives made
+from a replay carry the original capture times.
+"""
+
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import activesoup
+
+_INDEX = "index.jsonl"
+_BODIES = "bodies.bin"
+
+# The recorded body is the decoded content, so these no longer describe it
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """Raised on replay when a request wasn't recorded in the cassette"""
+
+    pass
+
+
+def _request_key(request: requests.PreparedRequest) -> str:
+    h = hashlib.sha256()
+    h.update(f"{request.method} {request.url}\n".encode("utf-8"))
+    body = request.body
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if isinstance(body, bytes):
+        h.update(body)
+    return h.hexdigest()
+
+
+class RecordingAdapter(BaseAdapter):
+    """A transport adapter which records traffic to a cassette
+
+    :param str path: the cassette directory. It is created if necessary;
+        if it already holds a cassette, new traffic is appended.
+    :param BaseAdapter adapter: the adapter which actually sends requests.
+        Defaults to a new :py:class:`requests.adapters.HTTPAdapter`.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        adapter: Optional[BaseAdapter] = None,
+    ) -> None:
+        super().__init__()
+        self.path = os.fspath(path)
+        os.makedirs(self.path, exist_ok=True)
+        self._adapter = adapter or HTTPAdapter()
+        self._lock = threading.Lock()
+        self._index = open(os.path.join(self.path, _INDEX), "a", encoding="utf-8")
+        self._bodies = open(os.path.join(self.path, _BODIES), "ab")
+
+    def send(  # type: ignore[override]
+        self, request: requests.PreparedRequest, **kwargs: Any
+    ) -> requests.Response:
+        response = self._adapter.send(request, **kwargs)
+        captured = time.time()
+        content = response.content
+
+        with self._lock:
+            offset = self._bodies.tell()
+            self._bodies.write(content)
+            entry = {
+                "key": _request_key(request),
+                "method": request.method,
+                "url": request.url,
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": [
+                    [k, v]
+                    for k, v in response.headers.items()
+                    if k.lower() not in _DROPPED_HEADERS
+                ],
+                "offset": offset,
+                "length": len(content),
+                "captured": captured,
+            }
+            self._bodies.flush()
+            self._index.write(json.dumps(entry) + "\n")
+            self._index.flush()
+
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            self._bodies.close()
+            self._index.close()
+        self._adapter.close()
+
+    def __enter__(self) -> "RecordingAdapter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """A transport adapter which answers requests from a cassette
+
+    :param str path: the cassette directory, as written by :py:class:`RecordingAdapter`
+
+    Requests which aren't in the cassette raise :py:class:`CassetteMiss`.
+    """
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        super().__init__()
+        self.path = os.fspath(path)
+        self._responses: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        with open(os.path.join(self.path, _INDEX), "r", encoding="utf-8") as index:
+            for line in index:
+                entry = json.loads(line)
+                self._responses.setdefault(entry["key"], []).append(entry)
+
+        self._bodies_file = open(os.path.join(self.path, _BODIES), "rb")
+        self._bodies: Union[mmap.mmap, bytes] = b""
+        if os.fstat(self._bodies_file.fileno()).st_size > 0:
+            self._bodies = mmap.mmap(
+                self._bodies_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+
+    def send(  # type: ignore[override]
+        self, request: requests.PreparedRequest, **kwargs: Any
+    ) -> requests.Response:
+        key = _request_key(request)
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                raise CassetteMiss(
+                    f"No recorded response for {request.method} {request.url}",
+                    request=request,
+                )
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        entry = entries[min(served, len(entries) - 1)]
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = CaseInsensitiveDict(dict(entry["headers"]))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url or entry["url"]
+        response.request = request
+        response.connection = self  # type: ignore[assignment]
+        offset, length = entry["offset"], entry["length"]
+        response._content = self._bodies[offset : offset + length]  # type: ignore
+        if "captured" in entry:
+            # Keep the time the response was recorded, not replayed
+            response.captured_at = datetime.datetime.fromtimestamp(  # type: ignore
+                entry["captured"], datetime.timezone.utc
+            )
+        return response
+
+    def close(self) -> None:
+        if isinstance(self._bodies, mmap.mmap):
+            self._bodies.close()
+        self._bodies_file.close()
+
+
+def _mount(driver: "activesoup.Driver", adapter: BaseAdapter) -> None:
+    for prefix in ("http://", "https://"):
+        driver.session.mount(prefix, adapter)
+
+
+def record(
+    driver: "activesoup.Driver", path: Union[str, "os.PathLike[str]"]
+) -> RecordingAdapter:
+    """Record all of ``driver``'s traffic into the cassette at ``path``
+
+    :returns: the adapter, which should be closed (or used as a context
+        manager) when recording is finished
+    :rtype: RecordingAdapter
+    """
+    adapter = RecordingAdapter(path)
+    _mount(driver, adapter)
+    return adapter
+
+
+def replay(
+    driver: "activesoup.Driver", path: Union[str, "os.PathLike[str]"]
+) -> ReplayAdapter:
+    """Answer all of ``driver``'s requests from the cassette at ``path``
+
+    :rtype: ReplayAdapter
+    """
+    adapter = ReplayAdapter(path)
+    _mount(driver, adapter)
+    return adapter
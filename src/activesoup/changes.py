@@ -0,0 +1,219 @@
+"""
+Detect what changed between two versions of a page, via
+:py:meth:`BoundTag.fingerprint <activesoup.html.BoundTag.fingerprint>` and
+:py:func:`activesoup.html.diff`.
+
+Every element is given a hash of its whole subtree - its tag, attributes and
+text, and the hashes of its children - in the style of a Merkle tree. Two
+elements with the same hash have the same content, however much of the page
+is inside them, so:
+
+* a fingerprint of a region of the page can be stored, and compared next
+  time the page is fetched, to skip extracting data from it if it hasn't
+  changed
+* a diff of two pages only has to descend into the subtrees whose hashes
+  differ, so its cost depends on how much changed, not on the size of the
+  page
+
+Comments are ignored, so that (for example) a timestamp in a comment doesn't
+make an otherwise identical page look different.
+"""
+
+import difflib
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+from xml.etree.ElementTree import Element
+
+# Each element's own content: its tag, attributes, and the runs of text
+# between its child elements
+_Content = Tuple[str, Tuple[Tuple[str, str], ...], Tuple[str, ...]]
+
+INSERTED, REMOVED, CHANGED = "inserted", "removed", "changed"
+
+
+def _children(e: Element) -> List[Element]:
+    return [c for c in e if isinstance(c.tag, str)]
+
+
+def _content(e: Element) -> _Content:
+    runs = []
+    run = e.text or ""
+    for c in e:
+        if isinstance(c.tag, str):
+            runs.append(run)
+            run = ""
+        run += c.tail or ""
+    runs.append(run)
+    return str(e.tag), tuple(sorted(e.attrib.items())), tuple(runs)
+
+
+def _changed(o: Element, n: Element) -> bool:
+    # Whether the element's own content differs enough to report. Runs of
+    # whitespace come and go as children are inserted and removed, so they
+    # aren't counted.
+    o_tag, o_attributes, o_runs = _content(o)
+    n_tag, n_attributes, n_runs = _content(n)
+    return (
+        o_tag != n_tag
+        or o_attributes != n_attributes
+        or [r for r in o_runs if not r.isspace() and r]
+        != [r for r in n_runs if not r.isspace() and r]
+    )
+
+
+def _update(h: Any, s: str) -> None:
+    data = s.encode("utf-8", "surrogatepass")
+    h.update(b"%d:" % len(data))
+    h.update(data)
+
+
+def subtree_hashes(root: Element) -> Dict[Element, bytes]:
+    """Hash every element under (and including) ``root``
+
+    :param Element root: the root of the tree to hash
+    :returns: the hash of each element's subtree, keyed by element
+    :rtype: Dict[Element, bytes]
+    """
+    hashes: Dict[Element, bytes] = {}
+    # Walked with an explicit stack, so children are hashed before their
+    # parents without recursing
+    stack: List[Tuple[Element, Optional[List[Element]]]] = [(root, None)]
+    while stack:
+        e, children = stack.pop()
+        if children is None:
+            children = _children(e)
+            stack.append((e, children))
+            stack.extend((c, None) for c in children)
+            continue
+
+        tag, attributes, runs = _content(e)
+        h = hashlib.blake2b(digest_size=16)
+        _update(h, tag)
+        h.update(b"%d:" % len(attributes))
+        for name, value in attributes:
+            _update(h, name)
+            _update(h, value)
+        h.update(b"%d:" % len(runs))
+        for run in runs:
+            _update(h, run)
+        for c in children:
+            h.update(hashes[c])
+        hashes[e] = h.digest()
+    return hashes
+
+
+class Change:
+    """A difference between two versions of a page
+
+    :param str kind: ``"inserted"``, ``"removed"``, or ``"changed"`` (the
+        element's own attributes or text changed - not just its children's)
+    :param old: the element in the old page, or ``None`` if it was inserted
+    :param new: the element in the new page, or ``None`` if it was removed
+    :param str path: where the element is, relative to the root of the diff,
+        in a form that can be passed to ``find`` (e.g. ``"body/div[2]/p[1]"``).
+        For removed elements, this is where it was in the old page.
+    """
+
+    __slots__ = ("kind", "old", "new", "path")
+
+    def __init__(self, kind: str, old: Any, new: Any, path: str) -> None:
+        self.kind = kind
+        self.old = old
+        self.new = new
+        self.path = path
+
+    def __repr__(self) -> str:
+        return f"Change[{self.kind} {self.path}]"
+
+
+def _child_paths(path: str, children: List[Element]) -> List[str]:
+    counts: Dict[str, int] = {}
+    paths = []
+    for c in children:
+        n = counts[c.tag] = counts.get(c.tag, 0) + 1
+        step = f"{c.tag}[{n}]"
+        paths.append(step if path == "." else f"{path}/{step}")
+    return paths
+
+
+_Task = Union[Change, Tuple[Element, Element, str]]
+
+
+def diff_elements(
+    old: Element,
+    new: Element,
+    old_hashes: Dict[Element, bytes],
+    new_hashes: Dict[Element, bytes],
+) -> List[Change]:
+    """The changes between the trees under ``old`` and ``new``, in document order
+
+    Children are matched up by their hashes (using :py:mod:`difflib`), and
+    only elements whose hashes differ are compared in any more detail.
+
+    :param Element old: the root of the old tree
+    :param Element new: the root of the new tree
+    :param old_hashes: the :py:func:`subtree_hashes` of the old tree
+    :param new_hashes: the :py:func:`subtree_hashes` of the new tree
+    :rtype: List[Change]
+    """
+    changes: List[Change] = []
+    stack: List[_Task] = [(old, new, ".")]
+    while stack:
+        task = stack.pop()
+        if isinstance(task, Change):
+            changes.append(task)
+            continue
+
+        o, n, path = task
+        if old_hashes[o] == new_hashes[n]:
+            continue
+        if _changed(o, n):
+            changes.append(Change(CHANGED, o, n, path))
+
+        old_children, new_children = _children(o), _children(n)
+        old_paths = _child_paths(path, old_children)
+        new_paths = _child_paths(path, new_children)
+        old_keys = [old_hashes[c] for c in old_children]
+        new_keys = [new_hashes[c] for c in new_children]
+
+        # Usually only a few children change, so the unchanged runs at each
+        # end are skipped before handing the rest to difflib
+        start = 0
+        end = min(len(old_keys), len(new_keys))
+        while start < end and old_keys[start] == new_keys[start]:
+            start += 1
+        trailing = 0
+        while (
+            trailing < end - start
+            and old_keys[-1 - trailing] == new_keys[-1 - trailing]
+        ):
+            trailing += 1
+
+        matcher = difflib.SequenceMatcher(
+            None,
+            old_keys[start : len(old_keys) - trailing],
+            new_keys[start : len(new_keys) - trailing],
+            autojunk=False,
+        )
+        tasks: List[_Task] = []
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == "equal":
+                continue
+            i1, i2, j1, j2 = i1 + start, i2 + start, j1 + start, j2 + start
+            i, j = i1, j1
+            # Elements replaced by ones with the same tag are compared, in
+            # case only part of them changed
+            while i < i2 and j < j2 and old_children[i].tag == new_children[j].tag:
+                tasks.append((old_children[i], new_children[j], new_paths[j]))
+                i += 1
+                j += 1
+            tasks.extend(
+                Change(REMOVED, old_children[k], None, old_paths[k])
+                for k in range(i, i2)
+            )
+            tasks.extend(
+                Change(INSERTED, None, new_children[k], new_paths[k])
+                for k in range(j, j2)
+            )
+        stack.extend(reversed(tasks))
+    return changes
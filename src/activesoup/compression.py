@@ -0,0 +1,134 @@
+"""
+Compressed transfers, and how much they save.
+
+Every :py:class:`activesoup.Driver` asks for responses to be compressed,
+offering every encoding that :py:mod:`urllib3` can decode here: ``gzip``
+and ``deflate`` always, ``br`` if the ``brotli`` (or ``brotlicffi``) package
+is installed, and ``zstd`` if ``zstandard`` is (and :py:mod:`urllib3` is
+version 2 or later). Recent versions of :py:mod:`requests` offer the same
+list; older ones only offer ``gzip`` and ``deflate``. The packages can be
+installed as extras:
+
+.. code-block::
+
+    pip install activesoup[brotli,zstd]
+
+Bodies are decompressed by :py:mod:`urllib3` as they're read, and a
+``Driver``'s ``max_body_bytes`` is checked against the decompressed size as
+it grows, so a small body that decompresses to something enormous is
+abandoned early. Otherwise the whole decompressed body is kept in memory:
+pages are parsed, and :py:meth:`CsvResponse.save
+<activesoup.response.CsvResponse.save>` writes, from the complete body.
+
+Each ``Driver`` keeps :py:class:`TransferStats`, recording how many bytes
+came over the wire for each host, and how many they decompressed to:
+
+>>> import activesoup
+>>> d = activesoup.Driver()
+>>> _ = d.get("https://github.com/jelford/activesoup")
+>>> stats = d.transfer_stats.hosts()["github.com"]
+>>> stats.responses, stats.wire_bytes <= stats.body_bytes
+(1, True)
+"""
+
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    from urllib3.util.request import ACCEPT_ENCODING as _SUPPORTED
+except ImportError:  # pragma: no cover - very old urllib3
+    _SUPPORTED = "gzip,deflate"
+
+#: The ``Accept-Encoding`` header sent with every request
+ACCEPT_ENCODING = ", ".join(e.strip() for e in _SUPPORTED.split(","))
+
+
+class HostTransfer:
+    """The data transferred from one host, as reported by :py:meth:`TransferStats.hosts`
+
+    :param str host: the host (and port, if not the default)
+    :param int responses: the number of responses received
+    :param int wire_bytes: the size of the bodies as they were sent, before
+        decompression
+    :param int body_bytes: the size of the bodies after decompression
+    :param encodings: the number of responses received with each
+        ``Content-Encoding`` (``"identity"`` for uncompressed ones)
+    """
+
+    __slots__ = ("host", "responses", "wire_bytes", "body_bytes", "encodings")
+
+    def __init__(self, host: str) -> None:
+        self.host = host
+        self.responses = 0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.encodings: Dict[str, int] = {}
+
+    @property
+    def ratio(self) -> float:
+        """The wire size as a proportion of the decompressed size (lower is
+        better)"""
+        return self.wire_bytes / self.body_bytes if self.body_bytes else 1.0
+
+    def _copy(self) -> "HostTransfer":
+        copy = HostTransfer(self.host)
+        copy.responses = self.responses
+        copy.wire_bytes = self.wire_bytes
+        copy.body_bytes = self.body_bytes
+        copy.encodings = dict(self.encodings)
+        return copy
+
+    def __repr__(self) -> str:
+        return (
+            f"HostTransfer[{self.host} responses={self.responses}"
+            f" wire={self.wire_bytes} body={self.body_bytes}]"
+        )
+
+
+class TransferStats:
+    """Counts the bytes received from each host, before and after
+    decompression
+
+    The stats are thread-safe, and may be shared between ``Driver`` objects
+    (by passing them as the ``Driver``'s ``transfer_stats``).
+    """
+
+    def __init__(self) -> None:
+        self._hosts: Dict[str, HostTransfer] = {}
+        self._lock = threading.Lock()
+
+    def record(self, response: requests.Response, wire_bytes: Optional[int]) -> None:
+        """Count a response whose body has been read
+
+        :param requests.Response response: the response
+        :param int wire_bytes: how many bytes of body were received, or
+            ``None`` if that isn't known (in which case the body is counted
+            as having been sent uncompressed)
+        """
+        host = urlsplit(response.url or "").netloc.lower()
+        body_bytes = len(response.content or b"")
+        encoding = response.headers.get("Content-Encoding", "identity").lower()
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = HostTransfer(host)
+            stats.responses += 1
+            stats.wire_bytes += body_bytes if wire_bytes is None else wire_bytes
+            stats.body_bytes += body_bytes
+            stats.encodings[encoding] = stats.encodings.get(encoding, 0) + 1
+
+    def hosts(self) -> Dict[str, HostTransfer]:
+        """The data transferred from each host so far
+
+        :rtype: Dict[str, HostTransfer]
+        """
+        with self._lock:
+            return {host: stats._copy() for host, stats in self._hosts.items()}
+
+    def clear(self) -> None:
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._hosts.clear()
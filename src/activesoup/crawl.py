@@ -0,0 +1,479 @@
+"""
+A simple site crawler, built on :py:class:`activesoup.Driver`.
+
+The :py:class:`Crawler` follows the links on each HTML page it visits,
+starting from one or more seed URLs:
+
+.. code-block::
+
+    from activesoup.crawl import Crawler
+
+    def on_page(url, page):
+        print(url, page.find(".//title"))
+
+    crawler = Crawler(
+        ["https://example.com/"],
+        on_page=on_page,
+        max_depth=3,
+        allowed_hosts={"example.com"},
+        checkpoint="crawl-state.json",
+    )
+    crawler.run()
+
+URLs are canonicalized (see :py:func:`canonicalize_url`) before being
+de-duplicated, so each page is visited only once. For very large crawls, a
+fixed-size :py:class:`BloomFilter` can be used for de-duplication in place of
+an exact set, trading a small chance of skipping a page for bounded memory.
+
+Politeness is enforced per host: there is a minimum delay between requests to
+the same host, and ``robots.txt`` is fetched (once per host) and honoured.
+All the crawler's workers share a :py:class:`activesoup.ratelimit.RateLimiter`,
+so the crawl also backs off from hosts that show signs of being overloaded
+(e.g. by responding with ``429 Too Many Requests``).
+"""
+
+import base64
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import posixpath
+import threading
+import time
+import urllib.robotparser
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+import activesoup.html
+from activesoup.driver import Driver
+from activesoup.ratelimit import RateLimiter
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_log = logging.getLogger(__name__)
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize ``url``, so that equivalent URLs compare equal
+
+    - the scheme and host are lower-cased, and default ports are dropped
+    - ``.`` and ``..`` path segments are resolved, and an empty path becomes ``/``
+    - query parameters are sorted
+    - the fragment is dropped
+
+    >>> canonicalize_url("HTTP://Example.com:80/a/./b/../c?b=2&a=1#section")
+    'http://example.com/a/c?a=1&b=2'
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port is not None and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo += f":{parts.password}"
+        host = f"{userinfo}@{host}"
+
+    path = parts.path or "/"
+    if "." in path:
+        normalized = posixpath.normpath(path)
+        if path.endswith("/") and normalized != "/":
+            normalized += "/"
+        path = normalized
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class BloomFilter:
+    """A fixed-size, probabilistic set of strings
+
+    :param int capacity: the number of items the filter is sized for
+    :param float error_rate: the false-positive rate at ``capacity`` items
+
+    Membership tests may return false positives (at roughly ``error_rate``),
+    but never false negatives:
+
+    >>> seen = BloomFilter(capacity=1000)
+    >>> seen.add("https://example.com/")
+    >>> "https://example.com/" in seen
+    True
+    >>> "https://example.com/other" in seen
+    False
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str) -> None:
+        for p in self._positions(item):
+            self._bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, str):
+            return False
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "bits": base64.b64encode(bytes(self._bits)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BloomFilter":
+        bloom = cls(data["capacity"], data["error_rate"])
+        bloom._bits = bytearray(base64.b64decode(data["bits"]))
+        return bloom
+
+
+class RobotsCache:
+    """Fetches and caches ``robots.txt`` for each host
+
+    :param Driver driver: used to fetch ``robots.txt`` files. The requests
+        are subject to the ``Driver``'s ``rate_limiter`` and counted in its
+        ``transfer_stats``, but don't move it to a new page.
+    :param str user_agent: the user agent to check rules against
+    :param float ttl: how long, in seconds, to keep each host's rules
+    :param float timeout: how long to wait for a ``robots.txt`` file, in
+        seconds. A host which doesn't respond in time is treated as having no
+        rules.
+    """
+
+    def __init__(
+        self,
+        driver: Driver,
+        user_agent: str = "*",
+        ttl: float = 3600,
+        timeout: float = 30,
+    ):
+        self._driver = driver
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.timeout = timeout
+        self._parsers: Dict[str, Tuple[float, urllib.robotparser.RobotFileParser]] = {}
+        self._origin_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def allowed(self, url: str) -> bool:
+        """Check whether the rules for ``url``'s host allow it to be fetched"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            origin_lock = self._origin_locks.setdefault(origin, threading.Lock())
+        # Only requests to the same host wait while its robots.txt is
+        # fetched, so one slow host doesn't hold up the rest of the crawl
+        with origin_lock:
+            cached = self._parsers.get(origin)
+            if cached is None or time.monotonic() - cached[0] > self.ttl:
+                cached = (time.monotonic(), self._fetch(origin))
+                self._parsers[origin] = cached
+        return cached[1].can_fetch(self.user_agent, url)
+
+    def _fetch(self, origin: str) -> urllib.robotparser.RobotFileParser:
+        parser = urllib.robotparser.RobotFileParser(f"{origin}/robots.txt")
+        prepped = self._driver.session.prepare_request(
+            requests.Request(method="GET", url=f"{origin}/robots.txt")
+        )
+        try:
+            response = self._driver._send(prepped, timeout=self.timeout)
+        except Exception:
+            parser.parse([])
+            return parser
+
+        if response.status_code in (401, 403):
+            parser.parse(["User-agent: *", "Disallow: /"])
+        elif response.status_code >= 400:
+            parser.parse([])
+        else:
+            parser.parse(response.text.splitlines())
+        return parser
+
+
+class Crawler:
+    """Crawl pages by following links, starting from ``start_urls``
+
+    :param start_urls: the seed URLs
+    :param on_page: called as ``on_page(url, driver)`` for each page that is
+        fetched, with a ``Driver`` that is on that page. Called from worker
+        threads.
+    :param on_error: called as ``on_error(url, exception)`` for each page
+        that couldn't be fetched, or for which ``on_page`` raised an
+        exception. Called from worker threads. Failures are also logged to
+        the ``activesoup.crawl`` logger.
+    :param int max_depth: how many links to follow away from the seed URLs
+    :param int max_pages: stop after fetching this many pages (pages which
+        are disallowed by ``robots.txt``, or which can't be fetched, aren't
+        counted)
+    :param int workers: the number of pages to fetch concurrently
+    :param float delay: minimum time, in seconds, between requests to the same host
+    :param allowed_hosts: if given, only follow links to these hosts
+    :param bool respect_robots: whether to honour ``robots.txt``
+    :param str user_agent: the ``User-Agent`` to send, and to check against ``robots.txt``
+    :param priority: called as ``priority(url, depth)`` to order the frontier;
+        lower values are fetched first. Defaults to breadth-first.
+    :param int bloom_capacity: if given, de-duplicate using a
+        :py:class:`BloomFilter` sized for this many URLs, instead of an exact set
+    :param str checkpoint: if given, the crawl's state is saved to this path
+        periodically and when the crawl finishes. If the file already exists,
+        the crawl resumes from it instead of starting from ``start_urls``.
+    :param int checkpoint_every: how many pages to fetch between checkpoints
+    :param driver_factory: creates the ``Driver`` used by each worker
+    :param RateLimiter rate_limiter: shared by all the workers' ``Driver``
+        objects (unless the ``driver_factory`` gives them their own). By
+        default, a limiter is created which sends at most one request to
+        each host every ``delay`` seconds.
+    """
+
+    def __init__(
+        self,
+        start_urls: Iterable[str],
+        on_page: Optional[Callable[[str, Driver], Any]] = None,
+        on_error: Optional[Callable[[str, Exception], Any]] = None,
+        max_depth: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        workers: int = 4,
+        delay: float = 1.0,
+        allowed_hosts: Optional[Iterable[str]] = None,
+        respect_robots: bool = True,
+        user_agent: str = "activesoup",
+        priority: Optional[Callable[[str, int], float]] = None,
+        bloom_capacity: Optional[int] = None,
+        checkpoint: Optional[str] = None,
+        checkpoint_every: int = 100,
+        driver_factory: Callable[[], Driver] = Driver,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self.on_page = on_page
+        self.on_error = on_error
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.workers = workers
+        self.allowed_hosts = (
+            {h.lower() for h in allowed_hosts} if allowed_hosts is not None else None
+        )
+        self.user_agent = user_agent
+        self.priority = priority or (lambda url, depth: depth)
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.driver_factory = driver_factory
+        self.pages_crawled = 0
+        self.pages_failed = 0
+
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(
+                rate=1 / delay if delay > 0 else None, max_concurrency=workers
+            )
+        self.rate_limiter = rate_limiter
+        self._robots_driver = self._new_driver() if respect_robots else None
+        self._robots = (
+            RobotsCache(self._robots_driver, user_agent)
+            if self._robots_driver is not None
+            else None
+        )
+        self._frontier: List[Tuple[float, int, str, int]] = []
+        self._sequence = 0
+        self._seen: Any = (
+            BloomFilter(bloom_capacity) if bloom_capacity is not None else set()
+        )
+        self._in_flight: Dict[str, int] = {}
+        self._condition = threading.Condition()
+        self._checkpoint_lock = threading.Lock()
+        self._stopped = False
+
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self._load_checkpoint(checkpoint)
+        else:
+            for url in start_urls:
+                self.enqueue(url, 0)
+
+    def _new_driver(self) -> Driver:
+        d = self.driver_factory()
+        d.session.headers["User-Agent"] = self.user_agent
+        if d.rate_limiter is None:
+            d.rate_limiter = self.rate_limiter
+        return d
+
+    def enqueue(self, url: str, depth: int) -> bool:
+        """Add ``url`` to the frontier, unless it has been seen before
+
+        :returns: whether the URL was added
+        :rtype: bool
+        """
+        canonical = canonicalize_url(url)
+        parts = urlsplit(canonical)
+        if parts.scheme not in _DEFAULT_PORTS:
+            return False
+        if self.allowed_hosts is not None and parts.hostname not in self.allowed_hosts:
+            return False
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+
+        with self._condition:
+            if canonical in self._seen:
+                return False
+            self._seen.add(canonical)
+            self._push(canonical, depth)
+            self._condition.notify()
+        return True
+
+    def _push(self, url: str, depth: int) -> None:
+        heapq.heappush(
+            self._frontier, (self.priority(url, depth), self._sequence, url, depth)
+        )
+        self._sequence += 1
+
+    def stop(self) -> None:
+        """Ask the workers to finish once their current page is done"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def run(self) -> int:
+        """Crawl until the frontier is exhausted, ``max_pages`` is reached, or
+        :py:meth:`stop` is called
+
+        :returns: the total number of pages fetched (including before a resume)
+        :rtype: int
+        """
+        threads = [
+            threading.Thread(target=self._work, name=f"activesoup-crawl-{i}")
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        if self._robots_driver is not None:
+            self._robots_driver.__exit__(None, None, None)
+        if self.checkpoint is not None:
+            self.save_checkpoint(self.checkpoint)
+        return self.pages_crawled
+
+    def _next(self) -> Optional[Tuple[str, int]]:
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+                if self.max_pages is not None and (
+                    self.pages_crawled + len(self._in_flight) >= self.max_pages
+                ):
+                    return None
+                if self._frontier:
+                    _, _, url, depth = heapq.heappop(self._frontier)
+                    self._in_flight[url] = depth
+                    return url, depth
+                if not self._in_flight:
+                    # Nothing queued, and nothing in progress that could queue more
+                    self._condition.notify_all()
+                    return None
+                self._condition.wait()
+
+    def _work(self) -> None:
+        with self._new_driver() as d:
+            while True:
+                item = self._next()
+                if item is None:
+                    return
+                url, depth = item
+                fetched = False
+                try:
+                    fetched = self._fetch(d, url)
+                    if fetched:
+                        self._visit(d, url, depth)
+                except Exception as e:
+                    self._failed(url, e, "Failed to process %s: %s")
+                finally:
+                    with self._condition:
+                        del self._in_flight[url]
+                        if fetched:
+                            self.pages_crawled += 1
+                        due = (
+                            fetched and self.pages_crawled % self.checkpoint_every == 0
+                        )
+                        self._condition.notify_all()
+                    if self.checkpoint is not None and due:
+                        self.save_checkpoint(self.checkpoint)
+
+    def _fetch(self, d: Driver, url: str) -> bool:
+        if self._robots is not None and not self._robots.allowed(url):
+            return False
+
+        try:
+            d.get(url)
+        except Exception as e:
+            self._failed(url, e, "Failed to fetch %s: %s")
+            return False
+        return True
+
+    def _failed(self, url: str, e: Exception, message: str) -> None:
+        _log.warning(message, url, e)
+        with self._condition:
+            self.pages_failed += 1
+        if self.on_error is not None:
+            self.on_error(url, e)
+
+    def _visit(self, d: Driver, url: str, depth: int) -> None:
+        if self.on_page is not None:
+            self.on_page(url, d)
+
+        if not isinstance(d.last_response, activesoup.html.BoundTag):
+            return
+        for url in d.links():
+            self.enqueue(url, depth + 1)
+
+    def save_checkpoint(self, path: str) -> None:
+        """Write the crawl's state to ``path``, so that it can be resumed
+
+        Pages which are being fetched at the time of the checkpoint are saved
+        as still to-do."""
+        with self._condition:
+            frontier = [(url, depth) for _, _, url, depth in self._frontier]
+            frontier.extend(self._in_flight.items())
+            if isinstance(self._seen, BloomFilter):
+                seen: Any = {"bloom": self._seen.to_dict()}
+            else:
+                seen = {"urls": sorted(self._seen)}
+            state = {
+                "frontier": frontier,
+                "seen": seen,
+                "pages_crawled": self.pages_crawled,
+            }
+
+        with self._checkpoint_lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+
+    def _load_checkpoint(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+        seen = state["seen"]
+        if "bloom" in seen:
+            self._seen = BloomFilter.from_dict(seen["bloom"])
+        else:
+            self._seen = set(seen["urls"])
+        for url, depth in state["frontier"]:
+            self._push(url, depth)
+        self.pages_crawled = state["pages_crawled"]
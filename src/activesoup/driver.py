@@ -1,14 +1,21 @@
+import datetime
 import functools
-from typing import Any, Dict, Optional, Callable
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 from urllib.parse import urljoin
 
 import requests
 
 import activesoup
-import activesoup.html
+from activesoup.compression import ACCEPT_ENCODING, TransferStats
+from activesoup.history import History, HistoryEntry
 from activesoup.response import CsvResponse, JsonResponse
 
+if TYPE_CHECKING:
+    from activesoup.ratelimit import RateLimiter
+    from activesoup.session_store import SessionState, SessionStore
+
 
 class DriverError(RuntimeError):
     """Errors that occur as part of operating the driver
@@ -20,9 +27,100 @@ class DriverError(RuntimeError):
     pass
 
 
+class ResourceLimitExceeded(DriverError):
+    """A page was abandoned because it went beyond one of the ``Driver``'s
+    resource limits (see :py:class:`Driver`)"""
+
+    pass
+
+
+class BodyTooLarge(ResourceLimitExceeded):
+    """The response body was larger than ``max_body_bytes``"""
+
+    pass
+
+
+class TooManyNodes(ResourceLimitExceeded):
+    """The page had more than ``max_nodes`` elements"""
+
+    pass
+
+
+class TooDeep(ResourceLimitExceeded):
+    """The page's elements were nested more than ``max_depth`` deep"""
+
+    pass
+
+
+class ParseTimeout(ResourceLimitExceeded):
+    """Parsing the page took longer than ``parse_timeout``"""
+
+    pass
+
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _read_body(response: requests.Response, max_bytes: Optional[int]) -> Optional[int]:
+    """Read the body of a streamed ``response``, giving up as soon as it's
+    known to be bigger than ``max_bytes`` (if given)
+
+    :returns: the number of bytes received before decompression, if known
+    """
+    if response._content is not False:  # type: ignore[attr-defined]
+        # Already in memory (e.g. replayed from a cassette)
+        size = len(response.content or b"")
+        if max_bytes is not None and size > max_bytes:
+            raise BodyTooLarge(
+                f"{response.url} is {size} bytes, more than the limit of {max_bytes}"
+            )
+        return None
+
+    length = response.headers.get("Content-Length", "")
+    if max_bytes is not None and length.isdigit() and int(length) > max_bytes:
+        raise BodyTooLarge(
+            f"{response.url} is {length} bytes, more than the limit of {max_bytes}"
+        )
+
+    chunks = []
+    size = 0
+    # iter_content gives the decompressed body, so compressed responses are
+    # held to the limit on their real size, and reading stops as soon as
+    # they go over it
+    for chunk in response.iter_content(_CHUNK_SIZE):
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise BodyTooLarge(
+                f"{response.url} is more than the limit of {max_bytes} bytes"
+            )
+        chunks.append(chunk)
+    response._content = b"".join(chunks)
+
+    tell = getattr(response.raw, "tell", None)
+    return tell() if callable(tell) else None
+
+
+def _stamp_captured_at(response: requests.Response, *args, **kwargs) -> None:
+    # A session hook, so it runs for each hop of a redirect, as soon as the
+    # response arrives. A response replayed from a cassette already has the
+    # time it was originally captured, which is kept.
+    if getattr(response, "captured_at", None) is None:
+        response.captured_at = datetime.datetime.now(  # type: ignore[attr-defined]
+            datetime.timezone.utc
+        )
+
+
 _Resolver = Callable[[requests.Response], activesoup.Response]
 
 
+def _resolve_html(driver: "Driver", response: requests.Response) -> activesoup.Response:
+    # The HTML machinery (and html5lib) is only imported once it's needed, so
+    # that clients which never fetch a page don't pay for it at startup
+    import activesoup.html
+
+    return activesoup.html.resolve(driver, response)
+
+
 class ContentResolver:
     def __init__(self):
         self._resolvers: Dict[str, _Resolver] = {}
@@ -67,24 +165,96 @@ class Driver:
 
     See :ref:`getting-started` for a full demo of usage.
 
+    Parsed pages can be queried from any number of threads at once (see
+    :py:meth:`activesoup.html.BoundTag.freeze`). A ``Driver`` itself tracks
+    a single current page, so threads shouldn't navigate the same ``Driver``;
+    instead, each thread can navigate its own :py:meth:`local` fork, all of
+    them sharing one session and connection pool.
+
+    The ``Driver`` remembers recently visited pages, so that it can go
+    :py:meth:`back` and :py:meth:`forward` without re-fetching them:
+
+    :param int history_depth: the number of pages to remember
+    :param int history_bytes: approximate memory budget for remembered pages.
+        Beyond this, older pages are kept only as their raw response (to be
+        re-parsed if revisited) or just their URL (to be re-fetched).
+
+    Pages from untrusted sites can be arbitrarily large or complex. To stop
+    one bad page from tying up a process, the ``Driver`` can abandon any page
+    that goes beyond some limits, by raising a
+    :py:class:`ResourceLimitExceeded` error. The limits are checked as the
+    page is downloaded and parsed, so the work stops as soon as a limit is
+    reached. By default, there are no limits.
+
+    :param int max_body_bytes: the largest response body to accept, in bytes
+        (after decompression). Raises :py:class:`BodyTooLarge`.
+    :param int max_nodes: the most elements an HTML page may have. Raises
+        :py:class:`TooManyNodes`.
+    :param int max_depth: how deeply elements may be nested in an HTML
+        page. Raises :py:class:`TooDeep`.
+    :param float parse_timeout: how long parsing an HTML page may take, in
+        seconds. Raises :py:class:`ParseTimeout`.
+    :param RateLimiter rate_limiter: if given, every request waits for the
+        go-ahead from this :py:class:`activesoup.ratelimit.RateLimiter`, which
+        may be shared with other ``Driver`` objects
+    :param TransferStats transfer_stats: where to count the bytes received
+        from each host, before and after decompression (see
+        :py:mod:`activesoup.compression`). May be shared with other ``Driver``
+        objects; by default, each ``Driver`` has its own.
     :param kwargs: optional keyword arguments may be passed, which will be set
         as attributes of the :py:class:`requests.Session` which will be used
-        for the lifetime of this ``Driver``:
+        for the lifetime of this ``Driver``. ``headers`` are added to the
+        session's default headers, rather than replacing them:
 
         >>> d = Driver(headers={"User-Agent": "activesoup script"})
         >>> d.session.headers["User-Agent"]
         'activesoup script'
+        >>> "gzip" in d.session.headers["Accept-Encoding"]
+        True
     """
 
-    def __init__(self, **kwargs) -> None:
+    def __init__(
+        self,
+        history_depth: int = 10,
+        history_bytes: int = 32 * 1024 * 1024,
+        max_body_bytes: Optional[int] = None,
+        max_nodes: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        parse_timeout: Optional[float] = None,
+        rate_limiter: Optional["RateLimiter"] = None,
+        transfer_stats: Optional[TransferStats] = None,
+        **kwargs,
+    ) -> None:
+        self.max_body_bytes = max_body_bytes
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.parse_timeout = parse_timeout
+        self.rate_limiter = rate_limiter
+        self.transfer_stats = (
+            TransferStats() if transfer_stats is None else transfer_stats
+        )
         self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        headers = kwargs.pop("headers", None)
         for k, v in kwargs.items():
             setattr(self.session, k, v)
+        if headers is not None:
+            self.session.headers.update(headers)
+        response_hooks = self.session.hooks.setdefault("response", [])
+        if callable(response_hooks):
+            response_hooks = self.session.hooks["response"] = [response_hooks]
+        response_hooks.insert(0, _stamp_captured_at)
+        self._owns_session = True
+        self._lock = threading.RLock()
+        self._thread_local = threading.local()
         self._last_response: Optional[activesoup.Response] = None
         self._raw_response: Optional[requests.Response] = None
+        self._restored_url: Optional[str] = None
+        self.history = History(max_entries=history_depth, max_bytes=history_bytes)
+        self.response_hooks: List[Callable[[requests.Response], Any]] = []
         self.content_resolver = ContentResolver()
         self.content_resolver.register(
-            "text/html", functools.partial(activesoup.html.resolve, self)
+            "text/html", functools.partial(_resolve_html, self)
         )
         self.content_resolver.register("text/csv", CsvResponse)
         self.content_resolver.register("application/json", JsonResponse)
@@ -93,7 +263,98 @@ class Driver:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        self.session.close()
+        if self._owns_session:
+            self.session.close()
+
+    def reset(self) -> "Driver":
+        """Forget the current page and the history
+
+        The session (with its cookies, headers and open connections) is
+        kept, so this is much cheaper than creating a new ``Driver``.
+
+        :returns: the ``Driver`` object itself
+        :rtype: Driver
+        """
+        with self._lock:
+            self._last_response = None
+            self._raw_response = None
+            self._restored_url = None
+            self.history.clear()
+        return self
+
+    def fork(self) -> "Driver":
+        """A new ``Driver`` which shares this one's session, but has its own
+        navigation state
+
+        :returns: the new ``Driver``
+        :rtype: Driver
+
+        The new ``Driver`` shares this one's :py:class:`requests.Session`
+        (so its cookies, headers and pool of open connections), along with
+        its limits, rate limiter, transfer stats, response hooks and content
+        resolvers. It
+        starts at this ``Driver``'s current URL (so relative URLs resolve
+        the same way), but with no current page and an empty history.
+
+        >>> d = Driver()
+        >>> _ = d.get("https://github.com/jelford/activesoup/")
+        >>> f = d.fork()
+        >>> f.session is d.session
+        True
+        >>> _ = f.get("issues/new")
+        >>> f.url, d.url
+        ('https://github.com/jelford/activesoup/issues/new', 'https://github.com/jelford/activesoup/')
+
+        Leaving a forked ``Driver``'s ``with`` block doesn't close the shared
+        session; only the original ``Driver`` does that.
+        """
+        d = type(self)(
+            history_depth=self.history.max_entries,
+            history_bytes=self.history.max_bytes,
+            max_body_bytes=self.max_body_bytes,
+            max_nodes=self.max_nodes,
+            max_depth=self.max_depth,
+            parse_timeout=self.parse_timeout,
+            rate_limiter=self.rate_limiter,
+            transfer_stats=self.transfer_stats,
+        )
+        d.session.close()
+        d.session = self.session
+        d._owns_session = False
+        d._restored_url = self.url
+        d.response_hooks = list(self.response_hooks)
+        for content_type, resolver in self.content_resolver._resolvers.items():
+            if getattr(resolver, "func", None) is _resolve_html:
+                # The built-in HTML resolver binds pages to its Driver
+                resolver = functools.partial(_resolve_html, d)
+            d.content_resolver.register(content_type, resolver)
+        return d
+
+    def local(self) -> "Driver":
+        """A :py:meth:`fork` of this ``Driver`` for the calling thread
+
+        :rtype: Driver
+
+        Each thread gets its own fork, the first time it calls ``local``, and
+        the same one every time after that. This lets a single ``Driver`` be
+        shared between threads: each thread navigates independently, while
+        they all share one session and its connection pool.
+
+        .. code-block::
+
+            d = activesoup.Driver()
+            d.get("https://example.com/login").form.submit({"user": "me"})
+
+            def worker(url):
+                return d.local().get(url).find(".//h1").text()
+
+            with concurrent.futures.ThreadPoolExecutor() as pool:
+                titles = list(pool.map(worker, urls))
+        """
+        d = getattr(self._thread_local, "driver", None)
+        if d is None:
+            d = self._thread_local.driver = self.fork()
+        return d
 
     def _resolve_url(self, possibly_relative_url) -> str:
         """Converts a relative URL into an absolute one if possible.
@@ -137,29 +398,258 @@ class Driver:
     def _do(self, request: requests.Request) -> "Driver":
         request.url = self._resolve_url(request.url)
         prepped = self.session.prepare_request(request)
-        return self._handle_response(self.session.send(prepped))
+        return self._handle_response(self._send(prepped))
+
+    def _send(
+        self, prepped: requests.PreparedRequest, timeout: Optional[float] = None
+    ) -> requests.Response:
+        if self.rate_limiter is None:
+            return self._fetch(prepped, timeout)
+
+        ticket = self.rate_limiter.acquire(prepped.url or "")
+        response = None
+        failed = False
+        try:
+            response = self._fetch(prepped, timeout)
+        except requests.RequestException:
+            failed = True
+            raise
+        finally:
+            self.rate_limiter.release(ticket, response, failed)
+        return response
+
+    def _fetch(
+        self, prepped: requests.PreparedRequest, timeout: Optional[float]
+    ) -> requests.Response:
+        response = self.session.send(prepped, stream=True, timeout=timeout)
+        try:
+            wire_bytes = _read_body(response, self.max_body_bytes)
+        except BaseException:
+            response.close()
+            raise
+        self.transfer_stats.record(response, wire_bytes)
+        return response
+
+    def add_response_hook(self, hook: Callable[[requests.Response], Any]) -> None:
+        """Call ``hook`` with every response the ``Driver`` receives
+
+        Hooks are called with the raw :py:class:`requests.Response`, before
+        it's resolved into an :py:class:`activesoup.Response`. Any redirects
+        that were followed along the way are available from the response's
+        ``history``. Each response has a ``captured_at`` attribute: the
+        (timezone-aware, UTC) :py:class:`datetime.datetime` when it was
+        received. See :py:class:`activesoup.warc.WarcWriter` for an example.
+
+        :param hook: a callable taking a :py:class:`requests.Response`
+        """
+        self.response_hooks.append(hook)
 
     def _handle_response(self, response: requests.Response) -> "Driver":
+        for hook in self.response_hooks:
+            hook(response)
+
         if response.status_code in range(300, 304):
             redirected_to = response.headers.get("Location", None)
             if not redirected_to:
                 raise DriverError("Found a redirect, but no onward location given")
             return self.get(redirected_to)
 
-        self._last_response = self.content_resolver.resolve(response)
-        self._raw_response = response
+        parsed = self.content_resolver.resolve(response)
+        with self._lock:
+            self._last_response = parsed
+            self._raw_response = response
+            self.history.push(
+                HistoryEntry(
+                    parsed.url,
+                    response,
+                    parsed,
+                    method=getattr(response.request, "method", None) or "GET",
+                )
+            )
 
         return self
 
+    def back(self) -> "Driver":
+        """Return to the previous page in the history
+
+        >>> d = Driver()
+        >>> _ = d.get("https://github.com/jelford/activesoup")
+        >>> _ = d.get("https://github.com/jelford/activesoup/issues/new")
+        >>> d.back().url
+        'https://github.com/jelford/activesoup'
+        >>> d.forward().url
+        'https://github.com/jelford/activesoup/issues/new'
+
+        If the page is still held in memory, no request is made and the page
+        is not parsed again, so any ``BoundTag`` objects from the earlier
+        visit remain valid. Otherwise the page is fetched again - unless it
+        was the result of a form submitted with ``POST`` (or any method but
+        ``GET``), in which case a :py:class:`DriverError` is raised and the
+        ``Driver`` stays on the current page.
+
+        :returns: the ``Driver`` object itself
+        :rtype: Driver
+        """
+        with self._lock:
+            entry = self.history.back()
+        if entry is None:
+            raise DriverError("No previous page in history")
+        try:
+            return self._revisit(entry)
+        except BaseException:
+            with self._lock:
+                self.history.forward()
+            raise
+
+    def forward(self) -> "Driver":
+        """Move forward to the next page in the history, after a call to :py:meth:`back`
+
+        :returns: the ``Driver`` object itself
+        :rtype: Driver
+        """
+        with self._lock:
+            entry = self.history.forward()
+        if entry is None:
+            raise DriverError("No next page in history")
+        try:
+            return self._revisit(entry)
+        except BaseException:
+            with self._lock:
+                self.history.back()
+            raise
+
+    def _revisit(self, entry: HistoryEntry) -> "Driver":
+        raw_response, parsed = entry.raw_response, entry.parsed
+        if raw_response is None:
+            if entry.method != "GET":
+                # As a browser would, rather than silently sending a GET (or
+                # re-submitting the form) in its place
+                raise DriverError(
+                    f"{entry.url} was the result of a {entry.method} request, and"
+                    " is no longer in memory; it won't be requested again"
+                )
+            prepped = self.session.prepare_request(
+                requests.Request(method="GET", url=entry.url)
+            )
+            raw_response = self._send(prepped)
+        if parsed is None:
+            parsed = self.content_resolver.resolve(raw_response)
+
+        with self._lock:
+            if entry.parsed is None:
+                entry.raw_response, entry.parsed = raw_response, parsed
+                self.history.evict()
+            self._last_response = parsed
+            self._raw_response = raw_response
+        return self
+
     @property
     def url(self) -> Optional[str]:
         """The URL of the current page
 
         :returns: ``None`` if no page has been loaded, otherwise the URL of the most recently
-            loaded page.
+            loaded page. After a session is restored with :py:meth:`restore`,
+            this is the URL of the page the saved ``Driver`` was on.
         :rtype: str
         """
-        return self._last_response.url if self._last_response is not None else None
+        if self._last_response is not None:
+            return self._last_response.url
+        return self._restored_url
+
+    def snapshot(self) -> "SessionState":
+        """Capture the state of this ``Driver``'s session
+
+        The snapshot records the session's cookies and headers, and the URL
+        of the current page. It is a JSON-compatible ``dict``, which can be
+        passed to :py:meth:`restore` - possibly in another process.
+
+        >>> d = Driver(headers={"User-Agent": "activesoup script"})
+        >>> _ = d.get("https://github.com/jelford/activesoup")
+        >>> restored = Driver().restore(d.snapshot())
+        >>> restored.url
+        'https://github.com/jelford/activesoup'
+        >>> restored.session.headers["User-Agent"]
+        'activesoup script'
+        """
+        from activesoup.session_store import cookies_to_list
+
+        return {
+            "url": self.url,
+            "headers": dict(self.session.headers),
+            "cookies": cookies_to_list(self.session.cookies),
+        }
+
+    def restore(self, snapshot: "SessionState", navigate: bool = False) -> "Driver":
+        """Restore session state captured by :py:meth:`snapshot`
+
+        :param SessionState snapshot: the state to restore
+        :param bool navigate: If ``True``, load the page the ``Driver`` was
+            on when the snapshot was taken. Otherwise (the default) no request
+            is made: the URL is remembered, so that relative URLs are resolved
+            against it, but there is no current page to inspect.
+
+        The ``Driver``'s history is cleared.
+        :returns: the ``Driver`` object itself
+        :rtype: Driver
+        """
+        from activesoup.session_store import cookies_from_list
+
+        self.session.headers.update(snapshot.get("headers", {}))
+        cookies_from_list(snapshot.get("cookies", []), self.session.cookies)
+        with self._lock:
+            self._last_response = None
+            self._raw_response = None
+            self._restored_url = snapshot.get("url")
+            # The pages visited before the restore belong to another session
+            self.history.clear()
+        if navigate and self._restored_url:
+            return self.get(self._restored_url)
+        return self
+
+    def save_session(self, store: "SessionStore") -> None:
+        """Save a :py:meth:`snapshot` of this ``Driver`` into ``store``
+
+        :param SessionStore store: e.g. a :py:class:`activesoup.session_store.FileSessionStore`
+        """
+        with store.lock():
+            store.save(self.snapshot())
+
+    def load_session(
+        self,
+        store: "SessionStore",
+        login: Optional[Callable[["Driver"], Any]] = None,
+        navigate: bool = False,
+    ) -> bool:
+        """Restore this ``Driver``'s session from ``store``
+
+        :param SessionStore store: where the session was saved by :py:meth:`save_session`
+        :param login: If given, and ``store`` does not hold a session yet,
+            ``login(driver)`` is called and the resulting session is saved.
+            The store's lock is held throughout, so when many workers start at
+            once, only one of them logs in.
+        :param bool navigate: passed on to :py:meth:`restore`
+        :returns: ``True`` if a saved session was restored, ``False`` otherwise
+        :rtype: bool
+
+        .. code-block::
+
+            from activesoup.session_store import SqliteSessionStore
+
+            def login(d):
+                d.get("https://example.com/login").form.submit({"user": "...", "password": "..."})
+
+            d = Driver()
+            d.load_session(SqliteSessionStore("/var/tmp/sessions.db"), login=login)
+        """
+        with store.lock():
+            state = store.load()
+            if state is not None:
+                self.restore(state, navigate=navigate)
+                return True
+            if login is not None:
+                login(self)
+                store.save(self.snapshot())
+            return False
 
     @property
     def last_response(self) -> Optional[activesoup.Response]:
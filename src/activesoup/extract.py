@@ -0,0 +1,279 @@
+"""
+Declarative extraction of data from a page, via :py:meth:`BoundTag.extract
+<activesoup.html.BoundTag.extract>`.
+
+A schema describes the data to pull out of the page, as a ``dict`` from the
+names of the fields in the result to *selectors*:
+
+``"h1"``
+    The text of the first matching element (or ``None``)
+
+``"a/@href"``
+    An attribute of the first matching element (or ``None``)
+
+``["li"]``
+    A list, with a value for every matching element
+
+``["li.item", {"name": "a", "href": "a/@href"}]``
+    A list, with a record for every matching element. The fields of each
+    record are found inside that element.
+
+``{"title": "h1", ...}``
+    A nested record, found in the same scope as its parent
+
+Selectors are a simplified form of CSS selector: a space-separated sequence
+of steps, where each step matches a descendant of the previous one. A step is
+a tag name (or ``*``), optionally followed by any number of ``.class`` and
+``#id`` qualifiers. A selector can end with ``/@attribute`` to take an
+attribute rather than the element's text; a selector that is *only*
+``@attribute`` takes the attribute from the element being scoped over.
+
+A schema is compiled into a plan once (and the plan is cached), and the plan
+finds every field in a single pass over the page - however many fields there
+are.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from xml.etree.ElementTree import Element
+
+Schema = Dict[str, Any]
+
+_Step = Tuple[Optional[str], frozenset, Optional[str]]
+
+_FIRST, _ALL, _RECORDS, _GROUP = "first", "all", "records", "group"
+
+
+def _parse_step(step: str, selector: str) -> _Step:
+    tag: Optional[str] = None
+    classes = []
+    element_id = None
+
+    pieces = step.replace(".", " .").replace("#", " #").split()
+    for piece in pieces:
+        if piece.startswith("."):
+            classes.append(piece[1:])
+        elif piece.startswith("#"):
+            element_id = piece[1:]
+        elif tag is None and piece != "*":
+            tag = piece
+        elif piece != "*":
+            raise ValueError(f"Can't understand step {step!r} of selector {selector!r}")
+
+    if any(not c for c in classes) or element_id == "":
+        raise ValueError(f"Can't understand step {step!r} of selector {selector!r}")
+    return tag, frozenset(classes), element_id
+
+
+def _parse_selector(selector: str) -> Tuple[Tuple[_Step, ...], Optional[str]]:
+    path, attribute = selector, None
+    if path.startswith("@"):
+        path, attribute = "", path[1:]
+    elif "/@" in path:
+        path, attribute = path.split("/@", 1)
+    elif path.endswith("/text()"):
+        path = path[: -len("/text()")]
+
+    steps = tuple(_parse_step(s, selector) for s in path.split())
+    if attribute == "" or (not steps and attribute is None):
+        raise ValueError(f"Can't understand selector {selector!r}")
+    return steps, attribute
+
+
+class _Field:
+    __slots__ = ("name", "kind", "steps", "attribute", "plan")
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        steps: Tuple[_Step, ...],
+        attribute: Optional[str],
+        plan: Optional["ExtractionPlan"],
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.steps = steps
+        self.attribute = attribute
+        self.plan = plan
+
+
+def _matches(step: _Step, e: Element) -> bool:
+    tag, classes, element_id = step
+    if tag is not None and e.tag != tag:
+        return False
+    if element_id is not None and e.get("id") != element_id:
+        return False
+    if classes and not classes.issubset(e.get("class", "").split()):
+        return False
+    return True
+
+
+# (field, index of the next step to match, record the field belongs to)
+_State = Tuple[_Field, int, Dict[str, Any]]
+
+
+class ExtractionPlan:
+    """A compiled schema. Create one with :py:func:`compile_schema`."""
+
+    def __init__(self, fields: List[_Field]) -> None:
+        self.fields = fields
+
+    def run(
+        self, root: Element, text_of: Optional[Callable[[Element], str]] = None
+    ) -> Dict[str, Any]:
+        """Extract a record from the tree under ``root``
+
+        :param Element root: the element to extract from
+        :param text_of: gives the text of a matched element. By default, this
+            is all the text inside the element, with whitespace normalized.
+        :rtype: Dict[str, Any]
+        """
+        return _run(self, root, text_of or _default_text)
+
+
+def _default_text(e: Element) -> str:
+    return " ".join("".join(e.itertext()).split())
+
+
+def _new_record(
+    plan: ExtractionPlan,
+    scope: Element,
+    states: List[_State],
+) -> Dict[str, Any]:
+    record: Dict[str, Any] = {}
+    for f in plan.fields:
+        if f.kind == _GROUP:
+            assert f.plan is not None
+            record[f.name] = _new_record(f.plan, scope, states)
+        elif not f.steps:
+            # Only an attribute of the scope element itself
+            value = scope.get(f.attribute or "")
+            record[f.name] = [value] if f.kind == _ALL else value
+        else:
+            record[f.name] = [] if f.kind in (_ALL, _RECORDS) else None
+            states.append((f, 0, record))
+    return record
+
+
+def _value(f: _Field, e: Element, text_of: Callable[[Element], str]) -> Any:
+    if f.attribute is not None:
+        return e.get(f.attribute)
+    return text_of(e)
+
+
+def _pass_down(
+    state: _State, states: List[_State], passed_down: Set[Tuple[int, int, int]]
+) -> None:
+    f, i, record = state
+    key = (id(f), i, id(record))
+    if key not in passed_down:
+        passed_down.add(key)
+        states.append(state)
+
+
+def _run(
+    plan: ExtractionPlan, root: Element, text_of: Callable[[Element], str]
+) -> Dict[str, Any]:
+    initial: List[_State] = []
+    result = _new_record(plan, root, initial)
+
+    stack: List[Tuple[Element, List[_State]]] = [
+        (child, initial) for child in reversed(root)
+    ]
+    while stack:
+        e, states = stack.pop()
+        if not isinstance(e.tag, str):
+            continue
+
+        descendant_states: List[_State] = []
+        # Nested elements which all match a step would each advance the same
+        # state, so each (field, step, record) is only passed down once -
+        # otherwise its matches would be found once per matching ancestor
+        passed_down: Set[Tuple[int, int, int]] = set()
+        for state in states:
+            f, i, record = state
+            if f.kind == _FIRST and record[f.name] is not None:
+                # Already found; no need to keep looking
+                continue
+            _pass_down(state, descendant_states, passed_down)
+            if not _matches(f.steps[i], e):
+                continue
+            if i + 1 < len(f.steps):
+                _pass_down((f, i + 1, record), descendant_states, passed_down)
+            elif f.kind == _FIRST:
+                record[f.name] = _value(f, e, text_of)
+            elif f.kind == _ALL:
+                record[f.name].append(_value(f, e, text_of))
+            else:
+                assert f.plan is not None
+                record[f.name].append(_new_record(f.plan, e, descendant_states))
+
+        if descendant_states:
+            stack.extend((child, descendant_states) for child in reversed(e))
+    return result
+
+
+def _compile(frozen: Any) -> ExtractionPlan:
+    fields = []
+    for name, spec in frozen:
+        kind, value = spec
+        if kind == "str":
+            steps, attribute = _parse_selector(value)
+            fields.append(_Field(name, _FIRST, steps, attribute, None))
+        elif kind == "dict":
+            fields.append(_Field(name, _GROUP, (), None, _compile(value)))
+        else:
+            selector, subschema = value
+            steps, attribute = _parse_selector(selector)
+            if subschema is None:
+                fields.append(_Field(name, _ALL, steps, attribute, None))
+            elif attribute is not None:
+                raise ValueError(
+                    f"Selector {selector!r} for a list of records can't select an attribute"
+                )
+            else:
+                fields.append(_Field(name, _RECORDS, steps, None, _compile(subschema)))
+    return ExtractionPlan(fields)
+
+
+def _freeze(schema: Schema) -> Any:
+    if not isinstance(schema, dict):
+        raise ValueError(f"Schema must be a dict, not {type(schema).__name__}")
+
+    frozen: List[Tuple[str, Any]] = []
+    for name, spec in schema.items():
+        if isinstance(spec, str):
+            frozen.append((name, ("str", spec)))
+        elif isinstance(spec, dict):
+            frozen.append((name, ("dict", _freeze(spec))))
+        elif isinstance(spec, list) and len(spec) == 1 and isinstance(spec[0], str):
+            frozen.append((name, ("list", (spec[0], None))))
+        elif (
+            isinstance(spec, list)
+            and len(spec) == 2
+            and isinstance(spec[0], str)
+            and isinstance(spec[1], dict)
+        ):
+            frozen.append((name, ("list", (spec[0], _freeze(spec[1])))))
+        else:
+            raise ValueError(f"Can't understand schema for field {name!r}: {spec!r}")
+    return tuple(frozen)
+
+
+@lru_cache(maxsize=256)
+def _compile_cached(frozen: Any) -> ExtractionPlan:
+    return _compile(frozen)
+
+
+def compile_schema(schema: Schema) -> ExtractionPlan:
+    """Compile ``schema`` into an :py:class:`ExtractionPlan`
+
+    Compiled plans are cached, so calling this again with an equal schema
+    is cheap.
+
+    >>> plan = compile_schema({"title": "h1", "links": ["a/@href"]})
+    >>> plan is compile_schema({"title": "h1", "links": ["a/@href"]})
+    True
+    """
+    return _compile_cached(_freeze(schema))
@@ -0,0 +1,167 @@
+"""
+Navigation history for :py:class:`activesoup.Driver`, backing
+:py:meth:`Driver.back <activesoup.Driver.back>` and
+:py:meth:`Driver.forward <activesoup.Driver.forward>`.
+
+Each entry in the history is kept at one of three levels of detail:
+
+1. The parsed response: going back to the page costs nothing
+2. The raw response: going back re-parses the page, but makes no request
+3. Just the URL: going back re-fetches the page
+
+The most recently visited pages are kept parsed. As the history outgrows its
+memory budget, the entries furthest from the current page are degraded down
+the levels above, so that the history's footprint stays bounded.
+"""
+
+from typing import List, Optional
+
+import requests
+
+import activesoup
+
+# Parsed documents take several times more memory than their source; this is
+# a rough factor used to estimate the footprint of a parsed entry.
+_PARSED_OVERHEAD = 8
+
+
+class HistoryEntry:
+    """A page in the navigation history
+
+    :param str url: the page's URL
+    :param requests.Response raw_response: the response, or ``None`` if it
+        has been evicted
+    :param activesoup.Response parsed: the resolved response, or ``None`` if
+        it has been evicted
+    :param str method: the method of the request that fetched the page.
+        Only pages fetched with ``GET`` are fetched again once evicted.
+    """
+
+    __slots__ = ("url", "raw_response", "parsed", "method")
+
+    def __init__(
+        self,
+        url: str,
+        raw_response: Optional[requests.Response],
+        parsed: Optional[activesoup.Response],
+        method: str = "GET",
+    ) -> None:
+        self.url = url
+        self.raw_response = raw_response
+        self.parsed = parsed
+        self.method = method
+
+    @property
+    def size(self) -> int:
+        """Estimated memory used by this entry, in bytes
+
+        :rtype: int"""
+        if self.raw_response is None:
+            return 0
+        raw_size = len(self.raw_response.content or b"")
+        if self.parsed is None:
+            return raw_size
+        return raw_size * (1 + _PARSED_OVERHEAD)
+
+    def __repr__(self) -> str:
+        if self.parsed is not None:
+            level = "parsed"
+        elif self.raw_response is not None:
+            level = "raw"
+        else:
+            level = "url"
+        return f"HistoryEntry[{self.url}, {level}]"
+
+
+class History:
+    """A bounded back/forward stack of visited pages
+
+    :param int max_entries: the most pages to remember. Once exceeded, the
+        oldest page is forgotten entirely.
+    :param int max_bytes: memory budget for the history. Once exceeded,
+        entries are evicted down to just their raw response, and then to just
+        their URL, starting with those furthest from the current page.
+
+    >>> h = History(max_entries=2)
+    >>> for url in ["https://example.com/1", "https://example.com/2", "https://example.com/3"]:
+    ...     h.push(HistoryEntry(url, None, None))
+    >>> [e.url for e in h.entries]
+    ['https://example.com/2', 'https://example.com/3']
+    >>> h.back().url
+    'https://example.com/2'
+    >>> h.back() is None
+    True
+    >>> h.forward().url
+    'https://example.com/3'
+    """
+
+    def __init__(self, max_entries: int = 10, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: List[HistoryEntry] = []
+        self._position = -1
+
+    @property
+    def current(self) -> Optional[HistoryEntry]:
+        """The entry for the current page, if there is one
+
+        :rtype: Optional[HistoryEntry]"""
+        return self.entries[self._position] if self._position >= 0 else None
+
+    def push(self, entry: HistoryEntry) -> None:
+        """Record a newly visited page
+
+        Any pages ahead of the current one (that could have been reached with
+        :py:meth:`forward`) are discarded, as they would be in a browser."""
+        del self.entries[self._position + 1 :]
+        self.entries.append(entry)
+        if len(self.entries) > self.max_entries:
+            del self.entries[: len(self.entries) - self.max_entries]
+        self._position = len(self.entries) - 1
+        self.evict()
+
+    def back(self) -> Optional[HistoryEntry]:
+        """Move to the previous page, returning its entry (or ``None`` if
+        already at the oldest page)"""
+        if self._position <= 0:
+            return None
+        self._position -= 1
+        return self.entries[self._position]
+
+    def forward(self) -> Optional[HistoryEntry]:
+        """Move to the next page, returning its entry (or ``None`` if already
+        at the newest page)"""
+        if self._position + 1 >= len(self.entries):
+            return None
+        self._position += 1
+        return self.entries[self._position]
+
+    def clear(self) -> None:
+        """Forget all pages"""
+        self.entries = []
+        self._position = -1
+
+    def evict(self) -> None:
+        """Degrade entries until the history fits within ``max_bytes``
+
+        This is called automatically by :py:meth:`push`; call it again after
+        re-populating an evicted entry."""
+        total = sum(e.size for e in self.entries)
+        if total <= self.max_bytes:
+            return
+
+        by_distance = sorted(
+            (i for i in range(len(self.entries)) if i != self._position),
+            key=lambda i: abs(i - self._position),
+            reverse=True,
+        )
+        for drop_raw in (False, True):
+            for i in by_distance:
+                if total <= self.max_bytes:
+                    return
+                e = self.entries[i]
+                before = e.size
+                e.parsed = None
+                if drop_raw:
+                    e.raw_response = None
+                total -= before - e.size
@@ -1,27 +1,345 @@
-from functools import lru_cache
-from typing import Callable, Dict, List, Optional, Any, cast
+import bisect
+import codecs
+import io
+import re
+import threading
+import time
+from functools import lru_cache, partial
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
+from urllib.parse import urljoin
 from xml.etree.ElementTree import Element
-from xml.etree.ElementTree import tostring as et_str
 
-import html5lib
 import requests
 
 import activesoup
-
+from activesoup import changes, serialize
+from activesoup.driver import ParseTimeout, TooDeep, TooManyNodes
+from activesoup.extract import ExtractionPlan, Schema, compile_schema
+from activesoup.multipart import MultipartBody
 
 _namespaces = ["http://www.w3.org/1999/xhtml"]
 
 
 def _strip_namespace(etree: Element) -> Element:
-    if type(etree.tag) != type(_strip_namespace):
-        # For comments, the tag comes through as a function that, when invoked, returns the element.
-        for ns in _namespaces:
-            etree.tag = etree.tag.replace(f"{{{ns}}}", "")
-    for c in etree:
-        _strip_namespace(c)
+    # Element.iter() walks the tree without recursing, so this copes with
+    # arbitrarily deep pages
+    for e in etree.iter():
+        if isinstance(e.tag, str):
+            # For comments, the tag comes through as a function that, when invoked, returns the element.
+            for ns in _namespaces:
+                e.tag = e.tag.replace(f"{{{ns}}}", "")
     return etree
 
 
+_has_scheme = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:").match
+_whitespace = re.compile(r"\s+")
+
+
+class _Document:
+    """State shared between all the ``BoundTag`` objects from one parsed page
+
+    ``activesoup`` never modifies a page once it's parsed, so any number of
+    threads can query it at once. The indexes and caches which are built up
+    as the page is queried are safe to share too: lazily-built indexes are
+    built under a lock, and cache entries are only ever added (if two
+    threads race to compute the same entry, they both get the one that was
+    stored first).
+    """
+
+    def __init__(self, root: Element, url: Optional[str]) -> None:
+        self.root = root
+        self.url = url
+        self._lock = threading.Lock()
+        self._base_url: Optional[str] = None
+        self._base_url_resolved = False
+        self.text_cache: Dict[Tuple[Element, bool, str], str] = {}
+        self.find_cache: Dict[Tuple[Element, str], Optional["BoundTag"]] = {}
+        self._text_index: Optional["_TextIndex"] = None
+        self._subtree_hashes: Optional[Dict[Element, bytes]] = None
+
+    @property
+    def text_index(self) -> "_TextIndex":
+        """Index of the words in the page, built the first time it's needed"""
+        if self._text_index is None:
+            with self._lock:
+                if self._text_index is None:
+                    self._text_index = _TextIndex(self.root)
+        return self._text_index
+
+    @property
+    def subtree_hashes(self) -> Dict[Element, bytes]:
+        """Hash of each element's subtree (see :py:mod:`activesoup.changes`),
+        computed the first time it's needed"""
+        if self._subtree_hashes is None:
+            with self._lock:
+                if self._subtree_hashes is None:
+                    self._subtree_hashes = changes.subtree_hashes(self.root)
+        return self._subtree_hashes
+
+    @property
+    def base_url(self) -> Optional[str]:
+        """The URL that relative links are resolved against, taking ``<base href>``
+        into account"""
+        if not self._base_url_resolved:
+            with self._lock:
+                if not self._base_url_resolved:
+                    self._base_url = self._find_base_url()
+                    self._base_url_resolved = True
+        return self._base_url
+
+    def _find_base_url(self) -> Optional[str]:
+        base = self.root.find(".//base[@href]")
+        href = base.get("href", "").strip() if base is not None else ""
+        if href and self.url:
+            return urljoin(self.url, href)
+        elif href and _has_scheme(href):
+            return href
+        return self.url
+
+    def freeze(self) -> None:
+        """Build all the lazily-built indexes now"""
+        self.text_index
+        self.subtree_hashes
+        self.base_url
+
+
+def _absolutize(base: Optional[str], hrefs: Iterable[str]) -> List[str]:
+    if not base:
+        return list(hrefs)
+
+    resolved: Dict[str, str] = {}
+    result = []
+    for href in hrefs:
+        url = resolved.get(href)
+        if url is None:
+            url = href if _has_scheme(href) else urljoin(base, href)
+            resolved[href] = url
+        result.append(url)
+    return result
+
+
+# Elements whose content isn't visible text
+_invisible_tags = frozenset(["script", "style", "template", "noscript"])
+
+
+def _visible_text(element: Element, normalize: bool, separator: str) -> str:
+    pieces: List[str] = []
+    # Walk the tree with an explicit stack (rather than recursion, which
+    # would be limited by the depth of the document). Each entry is either
+    # an element to descend into, or a tail string to emit once the element
+    # before it has been finished.
+    stack: List[Union[Element, str]] = [element]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            pieces.append(item)
+            continue
+        if item.tail and item is not element:
+            stack.append(item.tail)
+        if not isinstance(item.tag, str) or item.tag in _invisible_tags:
+            # Comments and processing instructions have a function as their tag
+            continue
+        if item.text:
+            pieces.append(item.text)
+        stack.extend(reversed(item))
+
+    text = separator.join(pieces)
+    if normalize:
+        text = _whitespace.sub(" ", text).strip()
+    return text
+
+
+def _text_content(
+    document: "_Document", element: Element, normalize: bool, separator: str
+) -> str:
+    key = (element, normalize, separator)
+    text = document.text_cache.get(key)
+    if text is None:
+        text = _visible_text(element, normalize, separator)
+        document.text_cache[key] = text
+    return text
+
+
+def text_contents(
+    tags: Iterable["BoundTag"], normalize: bool = True, separator: str = ""
+) -> List[str]:
+    """The :py:meth:`text_content <BoundTag.text_content>` of each of ``tags``
+
+    :param tags: the elements to get the text of, e.g. from :py:meth:`BoundTag.find_all`
+    :param bool normalize: as for :py:meth:`BoundTag.text_content`
+    :param str separator: as for :py:meth:`BoundTag.text_content`
+    :rtype: List[str]
+
+    >>> page = html_page('<html><body><ul><li>One</li><li> Two <b>2</b></li></ul></body></html>')
+    >>> text_contents(page.find_all("li"))
+    ['One', 'Two 2']
+    """
+    return [_text_content(t._document, t._et, normalize, separator) for t in tags]
+
+
+def diff(old: "BoundTag", new: "BoundTag") -> List[changes.Change]:
+    """What changed between ``old`` and ``new`` - two versions of the same
+    page, or part of a page
+
+    :rtype: List[activesoup.changes.Change]
+
+    Each change's ``old`` and ``new`` are the ``BoundTag`` of the element in
+    each version (or ``None``, if it was inserted or removed):
+
+    >>> old = html_page('<html><body><h1>News</h1><ul><li>One</li><li>Two</li></ul></body></html>')
+    >>> new = html_page('<html><body><h1>News</h1><ul><li>Zero</li><li>One</li><li>2</li></ul></body></html>')
+    >>> diff(old, new)
+    [Change[inserted body[1]/ul[1]/li[1]], Change[changed body[1]/ul[1]/li[3]]]
+    >>> [c.new.text() for c in diff(old, new)]
+    ['Zero', '2']
+
+    Subtrees are compared by their hashes (see :py:meth:`BoundTag.fingerprint`),
+    so unchanged parts of the page are skipped without looking inside them.
+    """
+
+    def bind(tag: BoundTag, e: Optional[Element]) -> Optional[BoundTag]:
+        if e is None:
+            return None
+        return _get_bound_tag_factory(e.tag)(
+            tag._driver, tag._raw_response, e, tag._document
+        )
+
+    found = changes.diff_elements(
+        old._et,
+        new._et,
+        old._document.subtree_hashes,
+        new._document.subtree_hashes,
+    )
+    for c in found:
+        c.old = bind(old, c.old)
+        c.new = bind(new, c.new)
+    return found
+
+
+def _table_rows(table: Element) -> Iterable[Element]:
+    for child in table:
+        if child.tag == "tr":
+            yield child
+        elif child.tag in ("thead", "tbody", "tfoot"):
+            yield from (row for row in child if row.tag == "tr")
+
+
+_words = re.compile(r"\w+")
+
+
+class _TextIndex:
+    """An inverted index from the (lower-cased) words of a page's text to the
+    elements whose own text contains them
+
+    An element's "own" text is its ``text``, plus the ``tail`` of each of its
+    children - i.e. the text that appears directly inside it.
+    """
+
+    def __init__(self, root: Element) -> None:
+        self.postings: Dict[str, List[Element]] = {}
+        self.parents: Dict[Element, Element] = {}
+        self.order: Dict[Element, int] = {}
+
+        stack = [root]
+        while stack:
+            e = stack.pop()
+            self.order[e] = len(self.order)
+            if not isinstance(e.tag, str) or e.tag in _invisible_tags:
+                continue
+            own_text = [e.text or ""]
+            for child in e:
+                self.parents[child] = e
+                own_text.append(child.tail or "")
+            for word in set(_words.findall(" ".join(own_text).lower())):
+                self.postings.setdefault(word, []).append(e)
+            stack.extend(reversed(e))
+
+        # The vocabulary, sorted forwards and by reversed word, so that the
+        # words starting (or ending) with a given string are a contiguous range
+        self.words = sorted(self.postings)
+        self.reversed_words = sorted(k[::-1] for k in self.postings)
+
+    def ancestors_or_self(self, e: Element) -> Iterable[Element]:
+        while True:
+            yield e
+            parent = self.parents.get(e)
+            if parent is None:
+                return
+            e = parent
+
+    def _words_with_prefix(self, words: List[str], prefix: str) -> List[str]:
+        start = bisect.bisect_left(words, prefix)
+        end = start
+        while end < len(words) and words[end].startswith(prefix):
+            end += 1
+        return words[start:end]
+
+    def _elements_with_word(
+        self, word: str, open_start: bool, open_end: bool
+    ) -> Set[Element]:
+        # A word at the start of a query may be the end of a longer word in the
+        # text (and vice-versa). Those are found from the sorted vocabulary;
+        # only a query that is part of a single word has to be matched against
+        # every word on the page.
+        if not open_start and not open_end:
+            keys: Iterable[str] = (word,) if word in self.postings else ()
+        elif open_start and open_end:
+            keys = [k for k in self.words if word in k]
+        elif open_start:
+            keys = [
+                k[::-1]
+                for k in self._words_with_prefix(self.reversed_words, word[::-1])
+            ]
+        else:
+            keys = self._words_with_prefix(self.words, word)
+
+        found: Set[Element] = set()
+        for k in keys:
+            found.update(self.postings[k])
+        return found
+
+    def candidates(self, query: str, tag: Optional[str]) -> Optional[Set[Element]]:
+        """Elements that contain every word of ``query``, or ``None`` if the
+        query has no words to look up"""
+        words = _words.findall(query)
+        if not words:
+            return None
+
+        result: Optional[Set[Element]] = None
+        for i, word in enumerate(words):
+            open_start = i == 0 and query.startswith(word)
+            open_end = i == len(words) - 1 and query.endswith(word)
+            owners = self._elements_with_word(word, open_start, open_end)
+
+            containing: Set[Element] = set()
+            for owner in owners:
+                for e in self.ancestors_or_self(owner):
+                    if e in containing:
+                        break
+                    containing.add(e)
+            if tag is not None:
+                containing = {e for e in containing if e.tag == tag}
+
+            result = containing if result is None else result & containing
+            if not result:
+                break
+        return result
+
+
 class BoundTag(activesoup.Response):
     """A ``BoundTag`` represents a single node in an HTML document.
 
@@ -57,19 +375,23 @@ class BoundTag(activesoup.Response):
         driver: "activesoup.Driver",
         raw_response: requests.Response,
         element: Element,
+        document: Optional[_Document] = None,
     ) -> None:
         super().__init__(raw_response, "text/html")
         self._driver = driver
         self._et = element
+        self._document = document or _Document(element, raw_response.url)
 
-    @lru_cache(maxsize=1024)
     def __getattr__(self, item: str) -> "BoundTag":
+        if item.startswith("_"):
+            # Not a tag name; most likely an attribute that hasn't been set
+            # yet (e.g. during unpickling)
+            raise AttributeError(f"{type(self)} has no attribute {item}")
         e = self._find(f".//{item}")
         if e is not None:
             return e
         raise AttributeError(f"{type(self)} has no attribute {item}")
 
-    @lru_cache(maxsize=1024)
     def __getitem__(self, attr: str) -> str:
         return self._et.attrib[attr]
 
@@ -109,11 +431,12 @@ class BoundTag(activesoup.Response):
 
         """
         return [
-            _get_bound_tag_factory(element_matcher)(self._driver, self._raw_response, e)
+            _get_bound_tag_factory(element_matcher)(
+                self._driver, self._raw_response, e, self._document
+            )
             for e in self._et.findall(f".//{element_matcher}")
         ]
 
-    @lru_cache(maxsize=1024)
     def find(self, xpath: str = None, **kwargs) -> Optional["BoundTag"]:
         """Find a single element matching the provided xpath expression
 
@@ -167,20 +490,303 @@ class BoundTag(activesoup.Response):
             # The following are equivalent:
             p.text()
             p.etree().text
+
+        Note that this is only the text before the node's first child. Use
+        :py:meth:`text_content` for all of the text inside the node.
         """
         return self._et.text
 
-    def html(self) -> bytes:
+    def text_content(self, normalize: bool = True, separator: str = "") -> str:
+        """All of the visible text inside this node
+
+        :param bool normalize: If ``True`` (the default), runs of whitespace
+            are collapsed into a single space, and leading and trailing
+            whitespace is removed.
+        :param str separator: inserted between each separate piece of text
+            (e.g. between the text of adjacent elements)
+        :rtype: str
+
+        The text inside ``<script>``, ``<style>``, ``<template>`` and
+        ``<noscript>`` elements, and inside comments, is skipped:
+
+        >>> page = html_page('<html><body><p>Hello <b>big</b>\\n  world<!-- comment --><script>var x;</script></p></body></html>')
+        >>> page.p.text_content()
+        'Hello big world'
+        >>> page.p.text_content(normalize=False)
+        'Hello big\\n  world'
+
+        >>> page = html_page('<html><body><ul><li>One</li><li>Two</li></ul></body></html>')
+        >>> page.ul.text_content(separator=" ")
+        'One Two'
+
+        The result is remembered for each element of the page, so it's cheap to
+        call repeatedly. To get the text of many elements at once, see
+        :py:func:`text_contents`.
+        """
+        return _text_content(self._document, self._et, normalize, separator)
+
+    def find_by_text(
+        self, text: Union[str, Pattern[str]], tag: Optional[str] = None
+    ) -> List["BoundTag"]:
+        """Find elements by their visible text
+
+        :param text: a substring to look for (matched case-insensitively, and
+            ignoring differences in whitespace), or a compiled regular
+            expression to search for
+        :param str tag: if given, only elements with this tag are returned.
+            Otherwise, the innermost elements containing the text are returned.
+        :rtype: List[BoundTag]
+
+        The text of an element is as given by :py:meth:`text_content`, with
+        the text of separate elements separated by a space.
+
+        >>> page = html_page('<html><body><table><tr><td>Invoice <b>1234</b></td><td>Paid</td></tr><tr><td>Invoice 1235</td><td>Due</td></tr></table><a href="/2">Next page</a></body></html>')
+        >>> page.find_by_text("next")
+        [BoundTag[a]]
+        >>> [r.text_content(separator=" ") for r in page.find_by_text("invoice 1234", tag="tr")]
+        ['Invoice 1234 Paid']
+
+        >>> import re
+        >>> [r.text_content() for r in page.find_by_text(re.compile(r"Invoice \\d+"), tag="td")]
+        ['Invoice 1234', 'Invoice 1235']
+
+        Substring searches are answered from an index of the words on the
+        page, which is built the first time this method is called. After that,
+        each search only looks at elements that contain the searched-for
+        words, rather than scanning the whole page. Regular expression
+        searches can't use the index, and check the text of every element.
+        """
+        document = self._document
+        index = document.text_index
+
+        if isinstance(text, str):
+            query = _whitespace.sub(" ", text).strip().lower()
+            found = index.candidates(query, tag)
+            if found is None:
+                found = set(self._et.iter(tag))
+            matches = [
+                e
+                for e in found
+                if query in _text_content(document, e, True, " ").lower()
+            ]
+        else:
+            matches = [
+                e
+                for e in self._et.iter(tag)
+                if isinstance(e.tag, str)
+                and text.search(_text_content(document, e, True, " "))
+            ]
+
+        if self._et is not document.root:
+            matches = [e for e in matches if self._et in index.ancestors_or_self(e)]
+
+        if tag is None:
+            # Only keep the innermost matches
+            enclosing: Set[Element] = set()
+            for e in matches:
+                parent = index.parents.get(e)
+                if parent is not None:
+                    enclosing.update(index.ancestors_or_self(parent))
+            matches = [e for e in matches if e not in enclosing]
+
+        matches.sort(key=index.order.__getitem__)
+        return [
+            _get_bound_tag_factory(e.tag)(self._driver, self._raw_response, e, document)
+            for e in matches
+        ]
+
+    def freeze(self) -> "BoundTag":
+        """Prepare the page for being queried from many threads at once
+
+        :returns: this ``BoundTag``
+        :rtype: BoundTag
+
+        A parsed page is never modified, and can always be queried from any
+        number of threads. Some queries (such as :py:meth:`find_by_text` and
+        :py:meth:`fingerprint`) build an index of the whole page the first
+        time they're used; ``freeze`` builds them all up-front, so that no
+        thread is held up waiting for another to build one.
+        """
+        self._document.freeze()
+        return self
+
+    def fingerprint(self) -> str:
+        """A hash of everything inside this element, as a hex string
+
+        :rtype: str
+
+        The fingerprint only changes if the element's tags, attributes or
+        text change (comments are ignored), so it can be stored and compared
+        the next time the page is fetched, to tell whether part of the page
+        is worth looking at again:
+
+        >>> old = html_page('<html><body><ul id="prices"><li>1.00</li></ul><p>Updated 09:00</p></body></html>')
+        >>> new = html_page('<html><body><ul id="prices"><li>1.00</li></ul><p>Updated 10:00</p></body></html>')
+        >>> old.find(".//ul").fingerprint() == new.find(".//ul").fingerprint()
+        True
+        >>> old.fingerprint() == new.fingerprint()
+        False
+
+        The first fingerprint taken on a page hashes the whole page; after
+        that, they're free.
+        """
+        return self._document.subtree_hashes[self._et].hex()
+
+    def extract(self, schema: Union[Schema, ExtractionPlan]) -> Dict[str, Any]:
+        """Extract structured data from inside this element, as described by ``schema``
+
+        :param schema: a schema (see :py:mod:`activesoup.extract`), or a plan
+            previously compiled with :py:func:`activesoup.extract.compile_schema`
+        :rtype: Dict[str, Any]
+
+        >>> page = html_page('''<html><body>
+        ...     <h1>Fruit</h1>
+        ...     <ul>
+        ...         <li class="item"><a href="/apple">Apple</a> <span class="price">0.50</span></li>
+        ...         <li class="item"><a href="/pear">Pear</a></li>
+        ...     </ul>
+        ... </body></html>''')
+        >>> page.extract({
+        ...     "title": "h1",
+        ...     "items": ["li.item", {"name": "a", "href": "a/@href", "price": "span.price"}],
+        ... })
+        {'title': 'Fruit', 'items': [{'name': 'Apple', 'href': '/apple', 'price': '0.50'}, {'name': 'Pear', 'href': '/pear', 'price': None}]}
+
+        All of the fields are found in a single pass over the element's
+        subtree, which is much cheaper than a separate :py:meth:`find` for
+        each one.
+        """
+        if not isinstance(schema, ExtractionPlan):
+            schema = compile_schema(schema)
+        document = self._document
+        return schema.run(self._et, lambda e: _text_content(document, e, True, ""))
+
+    def html(self, pretty: bool = False) -> bytes:
         """Render this element's HTML as bytes
 
+        :param bool pretty: indent nested elements onto their own lines
         :rtype: bytes
 
         The output is generated from the parsed HTML structure, as interpretted by ``html5lib``.
         ``html5lib`` is how ``activesoup`` interprets pages in the same way as the browser would,
         and that might mean making some changes to the structure of the document - for example,
         if the original HTML contained errors.
+
+        >>> page = html_page('<html><body><p>Fish &amp; chips<br>to go</p></body></html>')
+        >>> page.find(".//p").html()
+        b'<p>Fish &amp; chips<br>to go</p>'
+
+        The HTML is encoded as UTF-8. To save a large page (or part of one),
+        :py:meth:`write_html` avoids building all of its HTML in memory at once.
+        """
+        out = io.BytesIO()
+        serialize.write_html(self._et, out, pretty)
+        return out.getvalue()
+
+    def iter_html(self, pretty: bool = False) -> Iterator[str]:
+        """Render this element's HTML a chunk at a time
+
+        :param bool pretty: indent nested elements onto their own lines
+        :rtype: Iterator[str]
+
+        See :py:func:`activesoup.serialize.iter_html`.
+        """
+        return serialize.iter_html(self._et, pretty)
+
+    def write_html(
+        self, fp: IO[Any], pretty: bool = False, encoding: Optional[str] = "utf-8"
+    ) -> None:
+        """Write this element's HTML to a file, a chunk at a time
+
+        :param fp: a file-like object to write to
+        :param bool pretty: indent nested elements onto their own lines
+        :param str encoding: the encoding to write ``bytes`` in, or ``None`` to
+            write ``str`` (e.g. to a file opened in text mode)
+
+        See :py:func:`activesoup.serialize.write_html`.
+        """
+        serialize.write_html(self._et, fp, pretty, encoding)
+
+    def links(self) -> List[str]:
+        """All link targets within this element, as absolute URLs
+
+        :rtype: List[str]
+
+        Links are taken from the ``href`` of each ``<a>`` element, in document
+        order. Relative links are resolved against the page's URL, or its
+        ``<base href>`` if it has one:
+
+        >>> page = html_page('<html><head><base href="https://example.com/docs/"></head><body><a href="intro">Intro</a><a href="/about">About</a><a>No link</a></body></html>')
+        >>> page.links()
+        ['https://example.com/docs/intro', 'https://example.com/about']
+
+        ``links`` walks the tree once, and doesn't create a ``BoundTag`` for each
+        link - so it's much cheaper than the equivalent:
+
+        .. code-block::
+
+            [driver._resolve_url(a["href"]) for a in page.find_all("a") if "href" in a.attrs()]
         """
-        return et_str(self._et)
+        hrefs = (e.get("href", "").strip() for e in self._et.iter("a"))
+        return _absolutize(self._document.base_url, (h for h in hrefs if h))
+
+    def table_rows(self) -> List[Tuple[str, ...]]:
+        """The text of each cell of a ``<table>``, row by row
+
+        :rtype: List[Tuple[str, ...]]
+
+        Rows are taken from the table itself, and from its ``<thead>``,
+        ``<tbody>`` and ``<tfoot>`` (but not from nested tables). The text of
+        each cell has its whitespace normalized. A cell with a ``colspan`` is
+        repeated, so that columns line up:
+
+        >>> page = html_page('<html><body><table><tr><th>Name</th><th>Qty</th></tr><tr><td> Apple </td><td>3</td></tr><tr><td colspan="2">Sold out</td></tr></table></body></html>')
+        >>> page.table.table_rows()
+        [('Name', 'Qty'), ('Apple', '3'), ('Sold out', 'Sold out')]
+        """
+        rows = []
+        for row in _table_rows(self._et):
+            cells: List[str] = []
+            for cell in row:
+                if cell.tag not in ("td", "th"):
+                    continue
+                text = _text_content(self._document, cell, True, "")
+                try:
+                    span = max(1, int(cell.get("colspan", "1")))
+                except ValueError:
+                    span = 1
+                cells.extend([text] * span)
+            rows.append(tuple(cells))
+        return rows
+
+    def to_records(
+        self, columnar: bool = False
+    ) -> Union[List[Dict[str, str]], Dict[str, List[str]]]:
+        """The rows of a ``<table>``, keyed by the table's header row
+
+        :param bool columnar: If ``True``, return a ``dict`` of columns (each
+            a list of values) instead of a list of row ``dict`` objects.
+        :rtype: Union[List[Dict[str, str]], Dict[str, List[str]]]
+
+        The first row of the table is taken to be the header.
+
+        >>> page = html_page('<html><body><table><tr><th>Name</th><th>Qty</th></tr><tr><td>Apple</td><td>3</td></tr><tr><td>Pear</td><td>5</td></tr></table></body></html>')
+        >>> page.table.to_records()
+        [{'Name': 'Apple', 'Qty': '3'}, {'Name': 'Pear', 'Qty': '5'}]
+        >>> page.table.to_records(columnar=True)
+        {'Name': ['Apple', 'Pear'], 'Qty': ['3', '5']}
+        """
+        rows = self.table_rows()
+        if not rows:
+            return {} if columnar else []
+
+        header, body = rows[0], rows[1:]
+        if columnar:
+            return {
+                name: [row[i] if i < len(row) else "" for row in body]
+                for i, name in enumerate(header)
+            }
+        return [dict(zip(header, row)) for row in body]
 
     def attrs(self) -> Dict[str, str]:
         return self._et.attrib
@@ -204,12 +810,23 @@ class BoundTag(activesoup.Response):
         if kwargs:
             xpath += "".join(f"[@{k}='{v}']" for k, v in kwargs.items())
 
-        e = self._et.find(xpath)
-        if e is None:
-            return None
+        # Results are cached on the document (rather than, say, with
+        # lru_cache) so that they live exactly as long as the page does,
+        # and so that each query gives back the same BoundTag every time
+        key = (self._et, xpath)
+        cache = self._document.find_cache
+        try:
+            return cache[key]
+        except KeyError:
+            pass
 
-        bound_tag = _get_bound_tag_factory(e.tag)(self._driver, self._raw_response, e)
-        return bound_tag
+        e = self._et.find(xpath)
+        bound_tag = None
+        if e is not None:
+            bound_tag = _get_bound_tag_factory(e.tag)(
+                self._driver, self._raw_response, e, self._document
+            )
+        return cache.setdefault(key, bound_tag)
 
     def __repr__(self) -> str:
         return f"BoundTag[{self._et.tag}]"
@@ -258,9 +875,24 @@ class BoundForm(BoundTag):
         If the form has an ``action`` attribute specified, then the form will
         be submitted to that URL. If the form does not specify a ``method``,
         then ``POST`` will be used as a default.
+
+        If the form has ``enctype="multipart/form-data"``, then it will be
+        submitted as a multipart upload. Values for file fields may be given
+        as a path, or as a file object opened in binary mode. Files are
+        streamed from disk as the request is sent, rather than being read into
+        memory first:
+
+        .. code-block::
+
+            form.submit({"description": "Quarterly report", "report": "/tmp/report.pdf"})
+
+            with open("/tmp/report.pdf", "rb") as f:
+                form.submit({"description": "Quarterly report", "report": f})
         """
         try:
-            action = self._et.attrib["action"]
+            # Relative to the page the form is on, which may not be the
+            # Driver's current page (e.g. if it was loaded from an archive)
+            action = urljoin(self._raw_response.url, self._et.attrib["action"])
         except KeyError:
             action = cast(str, self._raw_response.request.url)
         try:
@@ -293,16 +925,198 @@ class BoundForm(BoundTag):
                         pass
 
         to_submit.update(data)
-        req = requests.Request(method=method, url=action, data=to_submit)
+        enctype = self._et.attrib.get("enctype", "").lower()
+        if enctype == "multipart/form-data":
+            file_fields = [
+                i["name"]
+                for i in self.find_all('input[@type="file"]')
+                if "name" in i.attrs()
+            ]
+            body = MultipartBody.from_form_data(to_submit, file_fields=file_fields)
+            req = requests.Request(
+                method=method,
+                url=action,
+                data=body,
+                headers={"Content-Type": body.content_type},
+            )
+        else:
+            req = requests.Request(method=method, url=action, data=to_submit)
         return self._driver._do(req)
 
 
-_BoundTagFactory = Callable[["activesoup.Driver", requests.Response, Element], BoundTag]
+_BoundTagFactory = Callable[
+    ["activesoup.Driver", requests.Response, Element, Optional[_Document]], BoundTag
+]
+
+
+_header_charset = re.compile(r"""charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_meta_charset = re.compile(
+    rb"""<meta[^>]*?charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE
+)
+
+# Labels that browsers treat as something other than their literal meaning
+# (see https://encoding.spec.whatwg.org/#names-and-labels)
+_encoding_overrides = {
+    "ascii": "cp1252",
+    "us-ascii": "cp1252",
+    "latin1": "cp1252",
+    "latin-1": "cp1252",
+    "l1": "cp1252",
+    "iso-8859-1": "cp1252",
+    "iso8859-1": "cp1252",
+    "iso_8859-1": "cp1252",
+    "cp819": "cp1252",
+    "ibm819": "cp1252",
+    "iso-8859-9": "cp1254",
+    "latin5": "cp1254",
+    "tis-620": "cp874",
+    "iso-8859-11": "cp874",
+    "gb2312": "gb18030",
+    "gbk": "gb18030",
+}
+
+
+def _lookup_encoding(label: str) -> Optional[str]:
+    label = label.strip().lower()
+    label = _encoding_overrides.get(label, label)
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def _prescan_encoding(response: requests.Response) -> Optional[str]:
+    """Work out a page's encoding from its BOM, ``Content-Type`` header, or a
+    ``<meta>`` tag near the start of the page - in that order of precedence.
+
+    This mirrors the first steps of the browser's encoding sniffing
+    algorithm. If none of them give an answer, ``None`` is returned.
+    """
+    content = response.content
+    if content.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if content.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    header = _header_charset.search(response.headers.get("Content-Type", ""))
+    if header is not None:
+        encoding = _lookup_encoding(header.group(1))
+        if encoding is not None:
+            return encoding
+
+    meta = _meta_charset.search(content, 0, 1024)
+    if meta is not None:
+        encoding = _lookup_encoding(meta.group(1).decode("ascii"))
+        if encoding is not None:
+            # A document can't declare itself as UTF-16 from inside; if it was,
+            # it'd have had a BOM.
+            return "utf-8" if encoding.startswith("utf-16") else encoding
+
+    return None
+
+
+def _decode(response: requests.Response) -> Union[str, bytes]:
+    encoding = _prescan_encoding(response)
+    if encoding is not None:
+        try:
+            return response.content.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    # Leave html5lib to work it out
+    return response.content
+
+
+@lru_cache(maxsize=None)
+def _limited_tree_builder() -> Any:
+    import html5lib
+    from html5lib.treebuilders.base import tableInsertModeElements
+
+    class _LimitedTreeBuilder(html5lib.getTreeBuilder("etree")):  # type: ignore
+        """Builds the tree as normal, but gives up as soon as the page goes
+        beyond the ``Driver``'s limits"""
+
+        def __init__(
+            self,
+            namespaceHTMLElements: bool,
+            url: str,
+            max_nodes: Optional[int],
+            max_depth: Optional[int],
+            deadline: Optional[float],
+        ) -> None:
+            super().__init__(namespaceHTMLElements)
+            self.url = url
+            self.max_nodes = max_nodes
+            self.max_depth = max_depth
+            self.deadline = deadline
+            self.nodes = 0
+
+        def _check_deadline(self) -> None:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                raise ParseTimeout(f"Ran out of time parsing {self.url}")
+
+        def _inserted(self) -> None:
+            self.nodes += 1
+            if self.max_nodes is not None and self.nodes > self.max_nodes:
+                raise TooManyNodes(
+                    f"{self.url} has more than {self.max_nodes} elements"
+                )
+            if self.max_depth is not None and len(self.openElements) > self.max_depth:
+                raise TooDeep(
+                    f"{self.url} has elements nested more than {self.max_depth} deep"
+                )
+            self._check_deadline()
+
+        def insertElementNormal(self, token):
+            element = super().insertElementNormal(token)
+            self._inserted()
+            return element
+
+        def insertElementTable(self, token):
+            # Unless the table's misnested content is being rearranged,
+            # html5lib hands the element on to insertElementNormal, which
+            # counts it already
+            rearranging = self.openElements[-1].name in tableInsertModeElements
+            element = super().insertElementTable(token)
+            if rearranging:
+                self._inserted()
+            return element
+
+        def insertText(self, data, parent=None):
+            super().insertText(data, parent)
+            self._check_deadline()
+
+    return _LimitedTreeBuilder
+
+
+def _parse(
+    driver: Optional["activesoup.Driver"], response: requests.Response
+) -> Element:
+    # html5lib is slow to import, so it's left until the first page is parsed
+    import html5lib
+
+    max_nodes = getattr(driver, "max_nodes", None)
+    max_depth = getattr(driver, "max_depth", None)
+    parse_timeout = getattr(driver, "parse_timeout", None)
+    if max_nodes is None and max_depth is None and parse_timeout is None:
+        # Decoding the page up-front (in one call into the C codec) is much faster
+        # than letting html5lib decode it as it goes, when we can tell the encoding
+        return html5lib.parse(_decode(response))
+
+    deadline = None
+    if parse_timeout is not None:
+        deadline = time.monotonic() + parse_timeout
+    tree_builder = partial(
+        _limited_tree_builder(),
+        url=response.url,
+        max_nodes=max_nodes,
+        max_depth=max_depth,
+        deadline=deadline,
+    )
+    return html5lib.HTMLParser(tree=tree_builder).parse(_decode(response))
 
 
 def resolve(driver: "activesoup.Driver", response: requests.Response) -> BoundTag:
-    parsed: Element = html5lib.parse(response.content)
-    return BoundTag(driver, response, _strip_namespace(parsed))
+    return BoundTag(driver, response, _strip_namespace(_parse(driver, response)))
 
 
 def _get_bound_tag_factory(tagname: str) -> _BoundTagFactory:
@@ -0,0 +1,241 @@
+"""
+Streaming ``multipart/form-data`` encoding, used when submitting forms with
+``enctype="multipart/form-data"`` via :py:meth:`activesoup.html.BoundForm.submit`.
+
+Unlike passing ``files=`` to :py:mod:`requests`, which builds the whole
+request body in memory, :py:class:`MultipartBody` is a file-like object that
+produces the body on demand. Files are read from disk in chunks as the
+connection asks for more data, so uploading a very large file takes a
+constant amount of memory.
+"""
+
+import io
+import mimetypes
+import os
+import uuid
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union, cast
+
+_CHUNK_SIZE = 64 * 1024
+
+_FileSource = Union[str, "os.PathLike[str]", IO[bytes]]
+
+
+class _FilePart:
+    def __init__(self, source: _FileSource) -> None:
+        self._source = source
+        if hasattr(source, "read"):
+            name = getattr(source, "name", None)
+            self.filename = os.path.basename(name) if isinstance(name, str) else ""
+            self.size = _remaining_size(cast(IO[bytes], source))
+            # Where the upload starts, so it can be sent again (e.g. after a
+            # redirect)
+            self._start = cast(IO[bytes], source).tell()
+        else:
+            path = os.fspath(cast(str, source))
+            self.filename = os.path.basename(path)
+            self.size = os.path.getsize(path)
+
+    @property
+    def content_type(self) -> str:
+        guessed, _ = mimetypes.guess_type(self.filename)
+        return guessed or "application/octet-stream"
+
+    def chunks(self, chunk_size: int) -> Iterator[bytes]:
+        if hasattr(self._source, "read"):
+            f = cast(IO[bytes], self._source)
+            f.seek(self._start)
+            yield from _read_chunks(f, chunk_size)
+        else:
+            with open(cast(str, self._source), "rb") as f:
+                yield from _read_chunks(f, chunk_size)
+
+
+def _remaining_size(f: IO[bytes]) -> int:
+    try:
+        return os.fstat(f.fileno()).st_size - f.tell()
+    except (AttributeError, OSError, ValueError):
+        position = f.tell()
+        end = f.seek(0, os.SEEK_END)
+        f.seek(position)
+        return end - position
+
+
+def _read_chunks(f: IO[bytes], chunk_size: int) -> Iterator[bytes]:
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        yield chunk
+
+
+def _is_file_value(value: Any) -> bool:
+    return hasattr(value, "read") or isinstance(value, os.PathLike)
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r\n", "%0D%0A")
+
+
+class MultipartBody:
+    """A lazily-generated ``multipart/form-data`` request body
+
+    :param fields: ``(name, value)`` pairs, in the order they should be sent.
+        ``value`` may be a ``str`` for a plain field, or a path / binary file
+        object for a file upload.
+    :param Iterable[str] file_fields: Names of fields whose ``str`` values should
+        be treated as paths to upload, rather than as plain text. Path-like
+        objects and file objects are always treated as uploads.
+
+    ``MultipartBody`` knows its total length up-front (so ``requests`` will
+    send a ``Content-Length`` rather than chunking the upload) and implements
+    ``read``, so it can be passed straight through as the ``data`` of a
+    :py:class:`requests.Request`. It can also be rewound to the start with
+    ``seek(0)``, which ``requests`` does to send the body again when a ``307``
+    or ``308`` redirect is followed:
+
+    >>> import io
+    >>> body = MultipartBody([("name", "value"), ("upload", io.BytesIO(b"data"))], boundary="b")
+    >>> body.content_type
+    'multipart/form-data; boundary=b'
+    >>> encoded = body.read()
+    >>> len(encoded) == len(body)
+    True
+    >>> print(encoded.decode("utf-8").replace("\\r\\n", "\\n"))
+    --b
+    Content-Disposition: form-data; name="name"
+    <BLANKLINE>
+    value
+    --b
+    Content-Disposition: form-data; name="upload"; filename=""
+    Content-Type: application/octet-stream
+    <BLANKLINE>
+    data
+    --b--
+    <BLANKLINE>
+    """
+
+    def __init__(
+        self,
+        fields: Iterable[Tuple[str, Any]],
+        file_fields: Iterable[str] = (),
+        boundary: Optional[str] = None,
+        chunk_size: int = _CHUNK_SIZE,
+    ) -> None:
+        self.boundary = boundary or uuid.uuid4().hex
+        self._chunk_size = chunk_size
+        file_fields = set(file_fields)
+
+        self._parts: List[Union[bytes, _FilePart]] = []
+        for name, value in fields:
+            if _is_file_value(value) or (name in file_fields and value):
+                f = _FilePart(value)
+                self._parts.append(
+                    self._header(
+                        f'form-data; name="{_quote(name)}"; filename="{_quote(f.filename)}"',
+                        f.content_type,
+                    )
+                )
+                self._parts.append(f)
+                self._parts.append(b"\r\n")
+            else:
+                self._parts.append(
+                    self._header(f'form-data; name="{_quote(name)}"')
+                    + str(value).encode("utf-8")
+                    + b"\r\n"
+                )
+        self._parts.append(f"--{self.boundary}--\r\n".encode("ascii"))
+
+        self._length = sum(
+            p.size if isinstance(p, _FilePart) else len(p) for p in self._parts
+        )
+        self._chunks = self._iter_chunks()
+        self._buffer = b""
+        self._position = 0
+
+    @classmethod
+    def from_form_data(
+        cls, data: Dict[str, Any], file_fields: Iterable[str] = ()
+    ) -> "MultipartBody":
+        """Build a body from a form submission dictionary
+
+        List values are sent as repeated fields, as for a url-encoded form.
+        """
+        fields: List[Tuple[str, Any]] = []
+        for name, value in data.items():
+            if isinstance(value, (list, tuple)):
+                fields.extend((name, v) for v in value)
+            else:
+                fields.append((name, value))
+        return cls(fields, file_fields=file_fields)
+
+    def _header(self, disposition: str, content_type: Optional[str] = None) -> bytes:
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type is not None:
+            header += f"Content-Type: {content_type}\r\n"
+        return (header + "\r\n").encode("utf-8")
+
+    @property
+    def content_type(self) -> str:
+        """The ``Content-Type`` header to send alongside this body
+
+        :rtype: str"""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, _FilePart):
+                yield from part.chunks(self._chunk_size)
+            else:
+                yield part
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to ``size`` bytes of the encoded body (or all of it if
+        ``size`` is negative)"""
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        if size < 0:
+            result, self._buffer = self._buffer, b""
+        else:
+            result, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._position += len(result)
+        return result
+
+    def tell(self) -> int:
+        """How many bytes of the body have been read so far"""
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """Rewind to the start of the body
+
+        The body is generated as it's read, so the only positions that can be
+        sought to are the start and the current position.
+        """
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._length
+        if offset == 0:
+            self._chunks = self._iter_chunks()
+            self._buffer = b""
+            self._position = 0
+        elif offset != self._position:
+            raise io.UnsupportedOperation(
+                "A MultipartBody can only be rewound to the start"
+            )
+        return self._position
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(self._chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def __len__(self) -> int:
+        return self._length
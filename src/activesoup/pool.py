@@ -0,0 +1,268 @@
+"""
+A pool of ready-to-use :py:class:`activesoup.Driver` objects, for services
+which scrape on demand.
+
+Creating a ``Driver`` for every job means a new :py:class:`requests.Session`,
+so new connections (and TLS handshakes) to the sites being scraped - and
+perhaps logging in again. A :py:class:`DriverPool` keeps ``Driver`` objects
+warm between jobs, with their connections open, and resets them between
+uses, so that nothing from one job leaks into the next:
+
+.. code-block::
+
+    from activesoup.pool import DriverPool
+
+    def login(d):
+        d.get("https://example.com/login").form.submit({"user": "...", "password": "..."})
+
+    pool = DriverPool(max_size=16, setup=login)
+
+    def handle_request(item_id):
+        with pool.driver() as d:
+            return d.get(f"https://example.com/items/{item_id}").find(".//h1").text()
+"""
+
+import collections
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+
+from activesoup.driver import Driver, DriverError
+
+
+class PoolExhausted(DriverError):
+    """Raised when no ``Driver`` became available within the timeout"""
+
+    pass
+
+
+def _close(driver: Driver) -> None:
+    driver.__exit__(None, None, None)
+
+
+class _Pooled:
+    __slots__ = ("driver", "cookies", "headers", "response_hooks", "last_used")
+
+    def __init__(self, driver: Driver) -> None:
+        self.driver = driver
+        # The session as it was set up; it's put back this way after each use
+        self.cookies: RequestsCookieJar = driver.session.cookies.copy()
+        self.headers = CaseInsensitiveDict(driver.session.headers)
+        self.response_hooks = list(driver.response_hooks)
+        self.last_used = time.monotonic()
+
+
+class DriverPool:
+    """A pool of warm ``Driver`` objects
+
+    :param factory: creates a new ``Driver`` for the pool
+    :param setup: if given, called as ``setup(driver)`` on each new
+        ``Driver`` (e.g. to log in). The session's cookies and headers, and the
+        ``Driver``'s response hooks, are put back the way ``setup`` left them
+        each time the ``Driver`` is returned.
+    :param int max_size: the most ``Driver`` objects to have at once
+        (idle or in use)
+    :param float idle_timeout: ``Driver`` objects which have been idle for
+        longer than this (in seconds) are closed
+    :param health_check: if given, called as ``health_check(driver)`` before
+        an idle ``Driver`` is handed out; if it returns ``False`` (or
+        raises), the ``Driver`` is closed and another is used instead
+    :param float timeout: how long :py:meth:`checkout` waits for a ``Driver``
+        when ``max_size`` are all in use, before raising :py:class:`PoolExhausted`.
+        ``None`` waits indefinitely.
+
+    When a ``Driver`` is returned to the pool, it is :py:meth:`reset
+    <activesoup.Driver.reset>` and its session's cookies and headers are put
+    back as they were after ``setup``, but its connections are kept open.
+    The pool is thread-safe.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Driver] = Driver,
+        setup: Optional[Callable[[Driver], Any]] = None,
+        max_size: int = 8,
+        idle_timeout: float = 300.0,
+        health_check: Optional[Callable[[Driver], bool]] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.factory = factory
+        self.setup = setup
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.timeout = timeout
+
+        # Most recently used at the right: those are handed out first, so
+        # that the ones at the left go idle and can be evicted
+        self._idle: Deque[_Pooled] = collections.deque()
+        self._in_use: Dict[int, _Pooled] = {}
+        self._creating = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        """The number of ``Driver`` objects in the pool, idle or in use"""
+        with self._condition:
+            return len(self._idle) + len(self._in_use) + self._creating
+
+    @property
+    def idle(self) -> int:
+        """The number of idle ``Driver`` objects, ready to be checked out"""
+        with self._condition:
+            return len(self._idle)
+
+    def _evict_idle(self, now: float) -> None:
+        while self._idle and now - self._idle[0].last_used > self.idle_timeout:
+            _close(self._idle.popleft().driver)
+
+    def _healthy(self, pooled: _Pooled) -> bool:
+        if self.health_check is None:
+            return True
+        try:
+            return bool(self.health_check(pooled.driver))
+        except Exception:
+            return False
+
+    def _create(self) -> _Pooled:
+        d = self.factory()
+        try:
+            if self.setup is not None:
+                self.setup(d)
+            d.reset()
+        except BaseException:
+            _close(d)
+            raise
+        return _Pooled(d)
+
+    def checkout(self, timeout: Optional[float] = None) -> Driver:
+        """Take a ``Driver`` from the pool, creating one if necessary
+
+        :param float timeout: overrides the pool's ``timeout``
+        :returns: a ``Driver``, which must be given back with :py:meth:`checkin`
+        :rtype: activesoup.Driver
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                pooled = None
+                while pooled is None:
+                    if self._closed:
+                        raise DriverError("The pool is closed")
+                    self._evict_idle(time.monotonic())
+                    if self._idle:
+                        pooled = self._idle.pop()
+                    elif len(self._in_use) + self._creating < self.max_size:
+                        self._creating += 1
+                        break
+                    else:
+                        remaining = (
+                            None if deadline is None else deadline - time.monotonic()
+                        )
+                        if remaining is not None and remaining <= 0:
+                            raise PoolExhausted(
+                                f"No Driver became available within {timeout}s"
+                            )
+                        self._condition.wait(remaining)
+
+            if pooled is None:
+                # Creating a Driver (and logging in) can be slow, so it's
+                # done without holding the lock
+                try:
+                    pooled = self._create()
+                finally:
+                    with self._condition:
+                        self._creating -= 1
+                        self._condition.notify()
+            elif not self._healthy(pooled):
+                _close(pooled.driver)
+                continue
+
+            with self._condition:
+                self._in_use[id(pooled.driver)] = pooled
+            return pooled.driver
+
+    def checkin(self, driver: Driver, discard: bool = False) -> None:
+        """Give a ``Driver`` back to the pool
+
+        :param activesoup.Driver driver: a ``Driver`` from :py:meth:`checkout`
+        :param bool discard: close the ``Driver`` rather than keeping it (e.g.
+            if it's known to be in a bad state)
+        """
+        with self._condition:
+            pooled = self._in_use.get(id(driver))
+            if pooled is None:
+                raise ValueError("This Driver was not checked out of this pool")
+            if discard or self._closed:
+                del self._in_use[id(driver)]
+                _close(driver)
+                self._condition.notify()
+                return
+
+        # The Driver still counts as in use while it's reset, so that no
+        # other Driver is created to take its place in the meantime
+        try:
+            driver.reset()
+            driver.session.cookies = pooled.cookies.copy()
+            driver.session.headers = pooled.headers.copy()
+            driver.response_hooks = list(pooled.response_hooks)
+        except BaseException:
+            with self._condition:
+                del self._in_use[id(driver)]
+                _close(driver)
+                self._condition.notify()
+            raise
+        pooled.last_used = time.monotonic()
+
+        with self._condition:
+            del self._in_use[id(driver)]
+            if self._closed:
+                _close(driver)
+            else:
+                self._idle.append(pooled)
+                self._evict_idle(pooled.last_used)
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def driver(self, timeout: Optional[float] = None) -> Iterator[Driver]:
+        """Check out a ``Driver`` for the duration of a ``with`` block
+
+        :param float timeout: overrides the pool's ``timeout``
+        """
+        d = self.checkout(timeout)
+        try:
+            yield d
+        finally:
+            self.checkin(d)
+
+    def prewarm(self, count: int) -> None:
+        """Create ``Driver`` objects ahead of time, until there are ``count``
+        (or ``max_size``) in the pool"""
+        drivers = []
+        try:
+            while self.size < min(count, self.max_size):
+                drivers.append(self.checkout())
+        finally:
+            for d in drivers:
+                self.checkin(d)
+
+    def close(self) -> None:
+        """Close all idle ``Driver`` objects; those in use are closed when
+        they're checked in"""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                _close(self._idle.pop().driver)
+            self._condition.notify_all()
+
+    def __enter__(self) -> "DriverPool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -0,0 +1,317 @@
+"""
+Adaptive per-host rate limiting, to apply backpressure when a site shows
+signs of being overloaded.
+
+A :py:class:`RateLimiter` is given to a :py:class:`activesoup.Driver`, and
+every request the ``Driver`` makes waits for the limiter's go-ahead. One
+limiter can be shared by any number of ``Driver`` objects, in any number of
+threads, so that the limits apply to everything a process sends to a host:
+
+.. code-block::
+
+    from activesoup.ratelimit import RateLimiter
+
+    limiter = RateLimiter(rate=5, max_concurrency=4)
+    drivers = [activesoup.Driver(rate_limiter=limiter) for _ in range(8)]
+
+Each host has a token bucket, which limits the rate of requests, and a limit
+on the number of requests in flight at once. Both adapt to how the host is
+coping, in the style of TCP's congestion control (AIMD: additive increase,
+multiplicative decrease):
+
+* Each response which comes back promptly and successfully raises the
+  limits a little, up to the configured maximums
+* A ``429 Too Many Requests`` or ``503 Service Unavailable``, a server error,
+  a failed connection, or a response much slower than usual for the host
+  halves them. A ``Retry-After`` header is obeyed, holding back all requests
+  to the host until then.
+
+The current limits for each host are available from :py:meth:`RateLimiter.limits`,
+for monitoring.
+"""
+
+import datetime
+import email.utils
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+# How much weight each new sample has in the moving averages
+_SMOOTHING = 0.2
+
+# A response has to be at least this much slower than usual (in seconds) to
+# count as slow, so that jitter on very fast responses isn't taken as overload
+_SLOW_MARGIN = 0.05
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """The number of seconds a ``Retry-After`` header asks us to wait"""
+    value = response.headers.get("Retry-After", "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(
+        0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+    )
+
+
+class HostLimits:
+    """The state of the limits for one host, as reported by :py:meth:`RateLimiter.limits`
+
+    :param str host: the host (and port, if not the default)
+    :param float rate: the current rate limit, in requests per second (or
+        ``None`` if the rate isn't limited)
+    :param float concurrency: the current limit on requests in flight
+    :param int in_flight: the number of requests currently in flight
+    :param float latency: moving average of the response time, in seconds
+    :param float error_rate: moving average of the proportion of requests
+        that failed
+    :param float retry_after: how long until requests may be sent again
+        (because of a ``Retry-After`` header), in seconds
+    """
+
+    __slots__ = (
+        "host",
+        "rate",
+        "concurrency",
+        "in_flight",
+        "latency",
+        "error_rate",
+        "retry_after",
+    )
+
+    def __init__(
+        self,
+        host: str,
+        rate: Optional[float],
+        concurrency: float,
+        in_flight: int,
+        latency: Optional[float],
+        error_rate: float,
+        retry_after: float,
+    ) -> None:
+        self.host = host
+        self.rate = rate
+        self.concurrency = concurrency
+        self.in_flight = in_flight
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+
+    def __repr__(self) -> str:
+        rate = "unlimited" if self.rate is None else f"{self.rate:.2f}/s"
+        return (
+            f"HostLimits[{self.host} rate={rate} concurrency={self.concurrency:.1f}"
+            f" in_flight={self.in_flight}]"
+        )
+
+
+class _HostState:
+    def __init__(self, rate: Optional[float], burst: float, now: float) -> None:
+        self.rate = rate
+        self.tokens = burst
+        self.refilled_at = now
+        self.concurrency = 1.0
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.blocked_until = 0.0
+        self.decreased_at = float("-inf")
+
+    def refill(self, now: float, burst: float) -> None:
+        if self.rate is not None:
+            self.tokens = min(burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def wait_time(self, now: float) -> Optional[float]:
+        """How long until a request may be sent: 0 if it may go now, or
+        ``None`` if it must wait for a request in flight to finish"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.concurrency):
+            return None
+        if self.rate is not None and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0
+
+
+class _Ticket:
+    __slots__ = ("host", "started")
+
+    def __init__(self, host: str, started: float) -> None:
+        self.host = host
+        self.started = started
+
+
+class RateLimiter:
+    """Limits the requests sent to each host, adapting to how the host responds
+
+    :param float rate: the most requests per second to send to any one host,
+        or ``None`` not to limit the rate (only the concurrency)
+    :param float burst: how many requests may be sent at once, before the
+        rate limit applies (the size of the token bucket)
+    :param int max_concurrency: the most requests to have in flight to any
+        one host at once
+    :param float min_rate: the rate is never reduced below this
+    :param float backoff: the factor to reduce the limits by when the host
+        is struggling
+    :param float slow_factor: a response is counted as a sign of overload
+        if it takes this many times longer than the host's usual response time
+
+    All requests to a host start off limited to one at a time; the limit
+    rises as the host responds successfully.
+
+    The limiter is thread-safe, and may be shared between ``Driver`` objects.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: float = 1,
+        max_concurrency: int = 8,
+        min_rate: float = 0.1,
+        backoff: float = 0.5,
+        slow_factor: float = 4.0,
+    ) -> None:
+        self.max_rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_rate = min(min_rate, rate) if rate is not None else min_rate
+        self.backoff = backoff
+        self.slow_factor = slow_factor
+        self._hosts: Dict[str, _HostState] = {}
+        self._condition = threading.Condition()
+
+    def acquire(self, url: str) -> _Ticket:
+        """Wait until a request may be sent to ``url``'s host
+
+        :returns: a ticket, which must be passed to :py:meth:`release` once
+            the request is finished
+        """
+        host = urlsplit(url).netloc.lower()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                state = self._hosts.get(host)
+                if state is None:
+                    state = self._hosts[host] = _HostState(
+                        self.max_rate, self.burst, now
+                    )
+                state.refill(now, self.burst)
+                wait = state.wait_time(now)
+                if wait == 0:
+                    if state.rate is not None:
+                        state.tokens -= 1
+                    state.in_flight += 1
+                    return _Ticket(host, now)
+                self._condition.wait(wait)
+
+    def release(
+        self,
+        ticket: _Ticket,
+        response: Optional[requests.Response] = None,
+        failed: bool = False,
+    ) -> None:
+        """Record the outcome of a request, and let the next one go
+
+        :param ticket: from :py:meth:`acquire`
+        :param requests.Response response: the response, if one was received
+        :param bool failed: if there's no ``response``, whether the request
+            failed in a way that suggests the host is struggling (e.g. it
+            couldn't be reached, or timed out)
+        """
+        with self._condition:
+            now = time.monotonic()
+            state = self._hosts[ticket.host]
+            state.in_flight -= 1
+            self._condition.notify_all()
+
+            if response is None and not failed:
+                return
+            latency = now - ticket.started
+            congested = response is None or response.status_code in (429, 503)
+            errored = congested or (
+                response is not None and response.status_code >= 500
+            )
+            slow = (
+                state.baseline_latency is not None
+                and latency > self.slow_factor * state.baseline_latency
+                and latency - state.baseline_latency > _SLOW_MARGIN
+            )
+            self._observe(state, latency, errored)
+
+            if response is not None:
+                retry_after = _retry_after(response) if congested else None
+                if retry_after is not None:
+                    state.blocked_until = max(state.blocked_until, now + retry_after)
+
+            if errored or slow:
+                self._decrease(state, now)
+            else:
+                self._increase(state)
+
+    def _observe(self, state: _HostState, latency: float, errored: bool) -> None:
+        state.error_rate += _SMOOTHING * (float(errored) - state.error_rate)
+        if errored:
+            # Failures are often quick, so they say nothing about the
+            # host's usual response time
+            return
+        if state.latency is None:
+            state.latency = latency
+        else:
+            state.latency += _SMOOTHING * (latency - state.latency)
+        if state.baseline_latency is None or latency < state.baseline_latency:
+            state.baseline_latency = latency
+        else:
+            # Drift up slowly, in case the host has just got slower for good
+            state.baseline_latency += 0.01 * (latency - state.baseline_latency)
+
+    def _increase(self, state: _HostState) -> None:
+        # Additive increase: about one more request in flight for each
+        # round of successful requests
+        state.concurrency = min(
+            float(self.max_concurrency), state.concurrency + 1 / state.concurrency
+        )
+        if state.rate is not None and self.max_rate is not None:
+            state.rate = min(self.max_rate, state.rate + self.max_rate / 20)
+
+    def _decrease(self, state: _HostState, now: float) -> None:
+        # Requests which were already in flight when the host started
+        # struggling will fail too; only back off once for all of them
+        if now - state.decreased_at < (state.latency or 0):
+            return
+        state.decreased_at = now
+        state.concurrency = max(1.0, state.concurrency * self.backoff)
+        if state.rate is not None:
+            state.rate = max(self.min_rate, state.rate * self.backoff)
+
+    def limits(self) -> Dict[str, HostLimits]:
+        """The current limits for each host that has been requested
+
+        :rtype: Dict[str, HostLimits]
+        """
+        with self._condition:
+            now = time.monotonic()
+            return {
+                host: HostLimits(
+                    host,
+                    state.rate,
+                    state.concurrency,
+                    state.in_flight,
+                    state.latency,
+                    state.error_rate,
+                    max(0.0, state.blocked_until - now),
+                )
+                for host, state in self._hosts.items()
+            }
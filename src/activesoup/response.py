@@ -18,7 +18,7 @@ The following specialisations are applied:
 
 ``application/json``
     :py:class:`activesoup.response.JsonResponse`. The JSON data is parsed into
-    python objects via ``json.loads``, and made available via dictionary-like 
+    python objects via ``json.loads``, and made available via dictionary-like
     access.
 
 """
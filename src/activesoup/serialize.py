@@ -0,0 +1,223 @@
+"""
+Serialize parsed pages back into HTML, as used by :py:meth:`BoundTag.html
+<activesoup.html.BoundTag.html>` and friends.
+
+The output follows the `HTML serialization algorithm
+<https://html.spec.whatwg.org/multipage/parsing.html#serialising-html-fragments>`__
+(the one behind ``outerHTML``), rather than XML's: void elements like
+``<br>`` have no end tag, the contents of ``<script>`` and ``<style>`` are
+written as they are, and text and attribute values are escaped as HTML.
+
+The document is written out a chunk at a time, so that a large page can be
+saved to a file without ever holding all of its HTML in memory:
+
+.. code-block::
+
+    with open("page.html", "wb") as f:
+        d.get("https://example.com/").write_html(f)
+"""
+
+from typing import IO, Any, Iterator, List, Optional, Tuple, Union
+from xml.etree.ElementTree import Comment, Element
+
+# Elements which never have content, so have no end tag
+_void_elements = {
+    "area",
+    "base",
+    "basefont",
+    "bgsound",
+    "br",
+    "col",
+    "embed",
+    "frame",
+    "hr",
+    "img",
+    "input",
+    "keygen",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+
+# Elements whose text is written without escaping
+_raw_text_elements = {
+    "script",
+    "style",
+    "xmp",
+    "iframe",
+    "noembed",
+    "noframes",
+    "plaintext",
+}
+
+# Elements where a leading newline is dropped by the parser, so one is added
+# back to keep any newline that was really part of the content
+_leading_newline_elements = {"pre", "textarea", "listing"}
+
+# Elements where whitespace matters, which pretty output mustn't re-indent
+_preformatted_elements = _leading_newline_elements | _raw_text_elements
+
+_attribute_prefixes = {
+    "http://www.w3.org/1999/xlink": "xlink:",
+    "http://www.w3.org/XML/1998/namespace": "xml:",
+    "http://www.w3.org/2000/xmlns/": "xmlns:",
+}
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _attribute_name(name: str) -> str:
+    if name.startswith("{"):
+        ns, _, local = name[1:].partition("}")
+        return _attribute_prefixes.get(ns, "") + local
+    return name
+
+
+def _escape_text(text: str) -> str:
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "\xa0" in text:
+        text = text.replace("\xa0", "&nbsp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _escape_attribute(value: str) -> str:
+    return _escape_text(value).replace('"', "&quot;")
+
+
+def _start_tag(name: str, e: Element) -> str:
+    if not e.attrib:
+        return f"<{name}>"
+    attributes = "".join(
+        f' {_attribute_name(k)}="{_escape_attribute(v)}"' for k, v in e.attrib.items()
+    )
+    return f"<{name}{attributes}>"
+
+
+def _is_blank(text: Optional[str]) -> bool:
+    return not text or text.isspace()
+
+
+def _indents_children(e: Element, name: str) -> bool:
+    return (
+        len(e) > 0
+        and name not in _preformatted_elements
+        and _is_blank(e.text)
+        and all(_is_blank(c.tail) for c in e)
+    )
+
+
+def _tokens(root: Element, pretty: bool) -> Iterator[str]:
+    # Walked with an explicit stack of the currently open elements, rather
+    # than recursively, so that deeply nested pages can't exhaust the
+    # interpreter's stack. Children are taken from an iterator as they're
+    # needed, so nothing is held for the parts of the page still to come.
+    # Each entry is (element, tag name, remaining children, whether its
+    # children are indented onto their own lines).
+    stack: List[Tuple[Element, str, Iterator[Element], bool]] = []
+    e: Optional[Element] = root
+    while True:
+        if e is not None:
+            indented = stack[-1][3] if stack else pretty
+            if stack and indented:
+                yield "\n" + "  " * len(stack)
+            if not isinstance(e.tag, str):
+                if e.tag is Comment:
+                    yield f"<!--{e.text or ''}-->"
+            else:
+                name = _local_name(e.tag)
+                yield _start_tag(name, e)
+                if name not in _void_elements:
+                    text = e.text or ""
+                    indent_children = indented and _indents_children(e, name)
+                    if name in _raw_text_elements:
+                        yield text
+                    elif not indent_children:
+                        if name in _leading_newline_elements and text.startswith("\n"):
+                            text = "\n" + text
+                        yield _escape_text(text)
+                    stack.append((e, name, iter(e), indent_children))
+                    e = None
+                    continue
+            # Comments and void elements are finished as soon as they start
+            if e is not root and e.tail and not stack[-1][3]:
+                yield _escape_text(e.tail)
+
+        if not stack:
+            return
+        parent, name, children, indent_children = stack[-1]
+        e = next(children, None)
+        if e is None:
+            stack.pop()
+            if indent_children:
+                yield "\n" + "  " * len(stack)
+            yield f"</{name}>"
+            if parent is not root and parent.tail and not stack[-1][3]:
+                yield _escape_text(parent.tail)
+
+
+def iter_html(
+    element: Element, pretty: bool = False, chunk_size: int = _CHUNK_SIZE
+) -> Iterator[str]:
+    """Serialize ``element`` as HTML, a chunk at a time
+
+    :param Element element: the element to serialize (along with everything
+        inside it - but not its ``tail``)
+    :param bool pretty: indent nested elements onto their own lines. Only
+        elements containing nothing but other elements (and whitespace) are
+        re-indented, so the text of the page is left as it was.
+    :param int chunk_size: roughly how many characters to put in each chunk
+    :rtype: Iterator[str]
+
+    >>> import html5lib
+    >>> root = html5lib.parse('<p class="a&b">x<br>y<script>if (a<b) go()</script>', namespaceHTMLElements=False)
+    >>> "".join(iter_html(root))
+    '<html><head></head><body><p class="a&amp;b">x<br>y<script>if (a<b) go()</script></p></body></html>'
+    >>> print("".join(iter_html(root, pretty=True)))
+    <html>
+      <head></head>
+      <body>
+        <p class="a&amp;b">x<br>y<script>if (a<b) go()</script></p>
+      </body>
+    </html>
+    """
+    buffer: List[str] = []
+    size = 0
+    for token in _tokens(element, pretty):
+        buffer.append(token)
+        size += len(token)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def write_html(
+    element: Element,
+    fp: IO[Any],
+    pretty: bool = False,
+    encoding: Optional[str] = "utf-8",
+) -> None:
+    """Serialize ``element`` as HTML, writing it to ``fp`` as it goes
+
+    :param Element element: the element to serialize
+    :param fp: a file-like object to write to
+    :param bool pretty: indent nested elements, as for :py:func:`iter_html`
+    :param str encoding: the encoding to write ``bytes`` in, or ``None`` to
+        write ``str`` (e.g. to a file opened in text mode)
+    """
+    for chunk in iter_html(element, pretty):
+        fp.write(chunk if encoding is None else chunk.encode(encoding))
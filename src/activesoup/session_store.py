@@ -0,0 +1,218 @@
+"""
+Stores for persisting the state of a :py:class:`activesoup.Driver` between
+processes, so that a worker can pick up an already-authenticated session
+instead of logging in again. See :py:meth:`activesoup.Driver.load_session`.
+
+Two stores are provided:
+
+:py:class:`FileSessionStore`
+    Keeps the session as a JSON document in a single file
+
+:py:class:`SqliteSessionStore`
+    Keeps any number of named sessions in an SQLite database
+
+Both stores provide a :py:meth:`lock <SessionStore.lock>`, which is held
+across processes on the same host. That allows a fleet of workers to share a
+single session: the first worker to take the lock logs in and saves the
+session, and the rest load it.
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from http.cookiejar import Cookie
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import requests.cookies
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore
+
+SessionState = Dict[str, Any]
+
+
+def cookies_to_list(jar: requests.cookies.RequestsCookieJar) -> List[Dict[str, Any]]:
+    """Serialize the cookies in ``jar`` into JSON-compatible dictionaries"""
+    return [
+        {
+            "name": c.name,
+            "value": c.value,
+            "domain": c.domain,
+            "path": c.path,
+            "port": c.port,
+            "secure": c.secure,
+            "expires": c.expires,
+            "discard": c.discard,
+            "rest": c._rest,  # type: ignore
+        }
+        for c in jar
+    ]
+
+
+def cookies_from_list(
+    cookies: List[Dict[str, Any]], jar: requests.cookies.RequestsCookieJar
+) -> None:
+    """Add cookies serialized by :py:func:`cookies_to_list` into ``jar``
+
+    Cookies which have expired since they were saved are skipped."""
+    now = time.time()
+    for c in cookies:
+        if c.get("expires") is not None and c["expires"] <= now:
+            continue
+        cookie: Cookie = requests.cookies.create_cookie(**c)
+        jar.set_cookie(cookie)
+
+
+class SessionStore:
+    """Base class for session stores
+
+    Subclasses implement :py:meth:`load`, :py:meth:`save` and :py:meth:`lock`.
+    """
+
+    def load(self) -> Optional[SessionState]:
+        """Load the stored session, or ``None`` if nothing has been stored"""
+        raise NotImplementedError()
+
+    def save(self, state: SessionState) -> None:
+        """Replace the stored session with ``state``"""
+        raise NotImplementedError()
+
+    def lock(self) -> "contextlib.AbstractContextManager[None]":
+        """Exclusive lock over the store, shared between threads and processes"""
+        raise NotImplementedError()
+
+
+class FileSessionStore(SessionStore):
+    """Store a session as JSON in the file at ``path``
+
+    :param str path: where to keep the session. A second file, with a
+        ``.lock`` suffix, is created alongside it for locking.
+
+    Writes are atomic, so a reader never sees a partially-written session.
+    """
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        self.path = os.fspath(path)
+        self._thread_lock = threading.Lock()
+        self._local = threading.local()
+
+    def load(self) -> Optional[SessionState]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, state: SessionState) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        if getattr(self._local, "held", False):
+            # Already held by this thread. Taking the file lock again would
+            # block against our own lock, from a second file descriptor.
+            yield
+            return
+
+        with self._thread_lock:
+            self._local.held = True
+            try:
+                if fcntl is None:
+                    yield
+                    return
+                with open(f"{self.path}.lock", "a") as lock_file:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            finally:
+                self._local.held = False
+
+
+class SqliteSessionStore(SessionStore):
+    """Store sessions in an SQLite database
+
+    :param str path: the database file; it is created if necessary.
+    :param str key: the name of the session to load and save. Several
+        sessions (e.g. for different accounts) can live in one database.
+
+    Locking uses SQLite's own write lock, so it works across processes
+    without any extra files.
+    """
+
+    def __init__(
+        self, path: Union[str, "os.PathLike[str]"], key: str = "default"
+    ) -> None:
+        self.path = os.fspath(path)
+        self.key = key
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS activesoup_sessions"
+                " (key TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def load(self) -> Optional[SessionState]:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT state FROM activesoup_sessions WHERE key = ?", (self.key,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def save(self, state: SessionState) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO activesoup_sessions (key, state, updated)"
+                " VALUES (?, ?, ?)",
+                (self.key, json.dumps(state), time.time()),
+            )
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        if getattr(self._local, "conn", None) is not None:
+            # Already held by this thread
+            yield
+            return
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.conn = conn
+        try:
+            yield
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._local.conn = None
+            conn.close()
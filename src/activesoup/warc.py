@@ -0,0 +1,356 @@
+"""
+Archive the pages fetched by a :py:class:`activesoup.Driver` as `WARC
+<https://iipc.github.io/warc-specifications/>`__ files, and read them back.
+
+:py:class:`WarcWriter` is a response hook (see
+:py:meth:`activesoup.Driver.add_response_hook`). Records are compressed and
+written by a background thread, so archiving doesn't hold up the
+``Driver``:
+
+.. code-block::
+
+    from activesoup.warc import WarcWriter
+
+    with WarcWriter("/var/archive") as archive:
+        d = activesoup.Driver()
+        d.add_response_hook(archive)
+        d.get("https://example.com/")
+
+Each record is compressed as a separate gzip member (as is conventional for
+``.warc.gz`` files), so that any record can be read without decompressing
+the rest of the file. :py:class:`WarcReader` memory-maps the archive files,
+and turns records back into :py:class:`activesoup.Response` objects without
+going back to the network:
+
+.. code-block::
+
+    from activesoup.warc import WarcReader
+
+    reader = WarcReader(["/var/archive/activesoup-00000.warc.gz"])
+    page = reader.load(reader.latest("https://example.com/"))
+    page.find(".//title")
+"""
+
+import base64
+import datetime
+import email.utils
+import hashlib
+import mmap
+import os
+import queue
+import threading
+import uuid
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import activesoup
+
+# The archived body is the decoded content, so these no longer describe it
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _http_block_header(response: requests.Response) -> bytes:
+    lines = [f"HTTP/1.1 {response.status_code} {response.reason or ''}".rstrip()]
+    lines.extend(
+        f"{k}: {v}"
+        for k, v in response.headers.items()
+        if k.lower() not in _DROPPED_HEADERS
+    )
+    lines.append(f"Content-Length: {len(response.content)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+
+
+def _captured_at(response: requests.Response) -> datetime.datetime:
+    # Records may be written some time after the response arrived (or replayed
+    # from a cassette), so the time of capture is taken from the response:
+    # the time the Driver stamped on it, or failing that its Date header
+    captured = getattr(response, "captured_at", None)
+    if captured is not None:
+        return captured.astimezone(datetime.timezone.utc)
+    try:
+        date = email.utils.parsedate_to_datetime(response.headers.get("Date", ""))
+    except (TypeError, ValueError):
+        return datetime.datetime.now(datetime.timezone.utc)
+    if date.tzinfo is None:
+        return date.replace(tzinfo=datetime.timezone.utc)
+    return date.astimezone(datetime.timezone.utc)
+
+
+def _warc_header(response: requests.Response, block_length: int) -> bytes:
+    date = _captured_at(response)
+    digest = base64.b32encode(hashlib.sha1(response.content).digest()).decode()
+    fields = [
+        "WARC/1.1",
+        "WARC-Type: response",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {date.strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        f"WARC-Target-URI: {response.url}",
+        f"WARC-Payload-Digest: sha1:{digest}",
+        "Content-Type: application/http; msgtype=response",
+        f"Content-Length: {block_length}",
+    ]
+    return ("\r\n".join(fields) + "\r\n\r\n").encode("utf-8")
+
+
+def _compress_record(response: requests.Response) -> List[bytes]:
+    http_header = _http_block_header(response)
+    body = response.content
+    compressor = zlib.compressobj(wbits=31)  # gzip framing
+    return [
+        compressor.compress(_warc_header(response, len(http_header) + len(body))),
+        compressor.compress(http_header),
+        compressor.compress(body),
+        compressor.compress(b"\r\n\r\n"),
+        compressor.flush(),
+    ]
+
+
+class WarcWriter:
+    """Writes responses to rotating ``.warc.gz`` files from a background thread
+
+    :param str directory: where to write the archive files (created if necessary)
+    :param str prefix: the archive files are named ``{prefix}-{n}.warc.gz``
+    :param int max_file_size: once a file reaches this size (in bytes), a
+        new file is started
+    :param int max_pending: the most responses to queue for writing. If the
+        writer falls this far behind, the ``Driver`` waits for it.
+
+    Call the writer with a :py:class:`requests.Response` to archive it, as
+    the ``Driver`` does with its response hooks. Redirect responses which
+    led to it are archived too. Call :py:meth:`close` (or use the writer as a
+    context manager) to finish writing.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, "os.PathLike[str]"],
+        prefix: str = "activesoup",
+        max_file_size: int = 1024 * 1024 * 1024,
+        max_pending: int = 1000,
+    ) -> None:
+        self.directory = os.fspath(directory)
+        self.prefix = prefix
+        self.max_file_size = max_file_size
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.paths: List[str] = []
+        self._file: Optional[Any] = None
+        self._queue: "queue.Queue[Optional[requests.Response]]" = queue.Queue(
+            max_pending
+        )
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, name="activesoup-warc-writer", daemon=True
+        )
+        self._thread.start()
+
+    def __call__(self, response: requests.Response) -> None:
+        if self._error is not None:
+            raise self._error
+        for r in list(response.history) + [response]:
+            self._queue.put(r)
+
+    def _next_file(self) -> Any:
+        if self._file is not None:
+            self._file.close()
+        n = len(self.paths)
+        while True:
+            path = os.path.join(self.directory, f"{self.prefix}-{n:05d}.warc.gz")
+            if not os.path.exists(path):
+                break
+            n += 1
+        self.paths.append(path)
+        self._file = open(path, "wb")
+        return self._file
+
+    def _run(self) -> None:
+        while True:
+            response = self._queue.get()
+            if response is None:
+                break
+            try:
+                f = self._file
+                if f is None or f.tell() >= self.max_file_size:
+                    f = self._next_file()
+                for chunk in _compress_record(response):
+                    f.write(chunk)
+            except BaseException as e:
+                self._error = e
+        if self._file is not None:
+            self._file.close()
+
+    def close(self) -> None:
+        """Finish writing all queued responses, and close the archive"""
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "WarcWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class WarcRecord:
+    """The location and headers of a single record in a WARC file
+
+    :param str path: the file the record is in
+    :param int offset: where the record's gzip member starts in the file
+    :param int length: the compressed length of the record
+    :param headers: the record's WARC headers
+    """
+
+    __slots__ = ("path", "offset", "length", "headers")
+
+    def __init__(
+        self, path: str, offset: int, length: int, headers: Dict[str, str]
+    ) -> None:
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.headers = headers
+
+    @property
+    def url(self) -> Optional[str]:
+        """The ``WARC-Target-URI`` of the record"""
+        return self.headers.get("WARC-Target-URI")
+
+    @property
+    def type(self) -> Optional[str]:
+        """The ``WARC-Type`` of the record (e.g. ``"response"``)"""
+        return self.headers.get("WARC-Type")
+
+    def __repr__(self) -> str:
+        return f"WarcRecord[{self.type} {self.url}]"
+
+
+def _split_headers(block: bytes) -> Tuple[List[str], bytes]:
+    head, _, rest = block.partition(b"\r\n\r\n")
+    return head.decode("utf-8", "replace").split("\r\n"), rest
+
+
+def _parse_fields(lines: Iterable[str]) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        fields[name.strip()] = value.strip()
+    return fields
+
+
+class WarcReader:
+    """Reads records from ``.warc.gz`` files
+
+    :param paths: the files to read, e.g. :py:attr:`WarcWriter.paths`
+
+    The files are memory-mapped, so opening even a very large archive is
+    cheap; the files are scanned to build an index of their records the
+    first time it's needed.
+    """
+
+    def __init__(self, paths: Iterable[Union[str, "os.PathLike[str]"]]) -> None:
+        self._maps: Dict[str, mmap.mmap] = {}
+        for p in paths:
+            path = os.fspath(p)
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size > 0:
+                    self._maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._records: Optional[List[WarcRecord]] = None
+
+    def _decompress(self, path: str, offset: int) -> Tuple[bytes, int]:
+        """Decompress the gzip member at ``offset``, returning its content and
+        compressed length"""
+        data = self._maps[path]
+        decompressor = zlib.decompressobj(wbits=31)
+        chunks = []
+        position = offset
+        while not decompressor.eof and position < len(data):
+            chunk = data[position : position + _CHUNK_SIZE]
+            position += len(chunk)
+            chunks.append(decompressor.decompress(chunk))
+        if not decompressor.eof:
+            raise ValueError(f"Truncated record at {path}:{offset}")
+        return b"".join(chunks), position - len(decompressor.unused_data) - offset
+
+    def __iter__(self) -> Iterator[WarcRecord]:
+        return iter(self.records)
+
+    @property
+    def records(self) -> List[WarcRecord]:
+        """All the records in the archive, in order
+
+        :rtype: List[WarcRecord]"""
+        if self._records is None:
+            records = []
+            for path, data in self._maps.items():
+                offset = 0
+                while offset < len(data):
+                    content, length = self._decompress(path, offset)
+                    lines, _ = _split_headers(content)
+                    records.append(
+                        WarcRecord(path, offset, length, _parse_fields(lines[1:]))
+                    )
+                    offset += length
+            self._records = records
+        return self._records
+
+    def latest(self, url: str) -> Optional[WarcRecord]:
+        """The most recently archived response for ``url``, if there is one"""
+        for record in reversed(self.records):
+            if record.type == "response" and record.url == url:
+                return record
+        return None
+
+    def raw_response(self, record: WarcRecord) -> requests.Response:
+        """Rebuild the :py:class:`requests.Response` stored in ``record``
+
+        Only responses are archived, so the response's ``request`` is a
+        ``GET`` of the record's URL.
+        """
+        content, _ = self._decompress(record.path, record.offset)
+        _, block = _split_headers(content)
+        block_length = int(record.headers.get("Content-Length", len(block)))
+        http_lines, body = _split_headers(block[:block_length])
+
+        status_line = http_lines[0].split(" ", 2)
+        response = requests.Response()
+        response.status_code = int(status_line[1])
+        response.reason = status_line[2] if len(status_line) > 2 else ""
+        response.headers = CaseInsensitiveDict(_parse_fields(http_lines[1:]))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = record.url or ""
+        response.request = requests.Request("GET", response.url).prepare()
+        response._content = body  # type: ignore
+        date = record.headers.get("WARC-Date")
+        if date:
+            response.captured_at = datetime.datetime.strptime(  # type: ignore
+                date, "%Y-%m-%dT%H:%M:%SZ"
+            ).replace(tzinfo=datetime.timezone.utc)
+        return response
+
+    def load(
+        self, record: WarcRecord, driver: Optional["activesoup.Driver"] = None
+    ) -> activesoup.Response:
+        """Resolve ``record`` into an :py:class:`activesoup.Response`, as if
+        it had just been fetched
+
+        :param WarcRecord record: a record from this archive
+        :param activesoup.Driver driver: the ``Driver`` whose content
+            resolvers to use, and that the resulting page should be bound to
+            (e.g. for submitting forms). A new ``Driver`` is used by default.
+        :rtype: activesoup.Response
+        """
+        if driver is None:
+            driver = activesoup.Driver()
+        return driver.content_resolver.resolve(self.raw_response(record))
+
+    def close(self) -> None:
+        for data in self._maps.values():
+            data.close()
@@ -54,10 +54,19 @@ class LocalWebServer:
             req = flask.request
             if req.method == "POST":
                 data = _render_multidict(req.form)
+                for fname, f in req.files.items():
+                    data[fname] = {
+                        "filename": f.filename,
+                        "content": f.read().decode("utf-8"),
+                    }
                 return (json.dumps(data), 200, {"Content-Type": "application/json"})
             else:
                 return render(name)
 
+        @self._local_web_server.route("/moved/<name>", methods=["POST"])
+        def moved(name):
+            return flask.redirect(f"/form/{name}", code=int(flask.request.args["code"]))
+
         @self._local_web_server.route("/status")
         def status():
             return ""
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+import requests_mock
+
+from activesoup import cassette, driver
+
+
+def test_replay_serves_recorded_pages_and_form_posts(localwebserver, tmp_path):
+    base = f"http://localhost:{localwebserver.port}"
+    tape = tmp_path / "tape"
+
+    d = driver.Driver()
+    with cassette.record(d, tape):
+        form = d.get(f"{base}/html/page_with_form.html").form
+        form.submit({"visible_field": "first"})
+        form.submit({"visible_field": "second"})
+
+    d = driver.Driver()
+    cassette.replay(d, tape)
+    form = d.get(f"{base}/html/page_with_form.html").form
+    assert form["action"] == "/form/any_submission"
+
+    assert form.submit({"visible_field": "second"})["visible_field"] == "second"
+    assert form.submit({"visible_field": "first"})["visible_field"] == "first"
+
+
+def test_replay_follows_recorded_redirects(tmp_path):
+    # The requests_mock fixture would bypass the cassette's adapter, so the
+    # site is served by an adapter of its own, which the cassette records
+    site = requests_mock.Adapter()
+    site.register_uri(
+        "GET", "http://remote.test/old", status_code=301, headers={"Location": "/new"}
+    )
+    site.register_uri(
+        "GET",
+        "http://remote.test/new",
+        headers={"Content-Type": "text/html"},
+        text="<html><body><p>moved</p></body></html>",
+    )
+    tape = tmp_path / "tape"
+
+    d = driver.Driver()
+    with cassette.RecordingAdapter(tape, adapter=site) as recording:
+        d.session.mount("http://", recording)
+        d.get("http://remote.test/old")
+
+    entries = [
+        json.loads(line) for line in (tape / "index.jsonl").read_text().splitlines()
+    ]
+    assert [(e["method"], e["url"], e["status"]) for e in entries] == [
+        ("GET", "http://remote.test/old", 301),
+        ("GET", "http://remote.test/new", 200),
+    ]
+    assert ["Location", "/new"] in entries[0]["headers"]
+
+    # The site is gone; only the cassette can answer
+    d = driver.Driver()
+    cassette.replay(d, tape)
+    page = d.get("http://remote.test/old")
+    assert page.url == "http://remote.test/new"
+    assert page.p.text() == "moved"
+    assert site.call_count == 2
+
+
+def test_unrecorded_requests_are_not_sent(tmp_path):
+    tape = tmp_path / "tape"
+    cassette.RecordingAdapter(tape).close()
+
+    d = driver.Driver()
+    cassette.replay(d, tape)
+    with pytest.raises(cassette.CassetteMiss):
+        d.get("http://remote.test/")
@@ -0,0 +1,67 @@
+from activesoup import driver, html
+
+
+def _page(requests_mock, body, url="http://remote.test/"):
+    requests_mock.get(
+        url,
+        headers={"Content-Type": "text/html; charset=utf-8"},
+        content=f"<html><body>{body}</body></html>".encode("utf-8"),
+    )
+    return driver.Driver().get(url)
+
+
+def test_identical_pages_have_no_changes(requests_mock):
+    body = "<div id='a'><p>One</p><p>Two</p></div>"
+    old = _page(requests_mock, body)
+    new = _page(requests_mock, body)
+
+    assert old.fingerprint() == new.fingerprint()
+    assert len(old.fingerprint()) == 32
+    assert html.diff(old, new) == []
+
+
+def test_comments_do_not_affect_fingerprint(requests_mock):
+    old = _page(requests_mock, "<p>One<!-- generated 09:00 --> two</p>")
+    new = _page(requests_mock, "<p>One<!-- generated 10:00 --> two</p>")
+
+    assert old.fingerprint() == new.fingerprint()
+
+
+def test_changes_are_found_with_their_paths(requests_mock):
+    old = _page(
+        requests_mock,
+        "<div><p>One</p><p class='x'>Two</p></div><ul><li>A</li><li>B</li></ul>",
+    )
+    new = _page(
+        requests_mock,
+        "<div><p>One</p><p class='y'>Two</p></div><ul><li>A</li></ul><footer>new</footer>",
+    )
+
+    found = html.diff(old, new)
+
+    assert [(c.kind, c.path) for c in found] == [
+        ("changed", "body[1]/div[1]/p[2]"),
+        ("removed", "body[1]/ul[1]/li[2]"),
+        ("inserted", "body[1]/footer[1]"),
+    ]
+    changed, removed, inserted = found
+    assert changed.old.attrs()["class"] == "x"
+    assert changed.new.attrs()["class"] == "y"
+    assert new.find(changed.path).attrs()["class"] == "y"
+    assert removed.new is None and removed.old.text() == "B"
+    assert inserted.old is None and inserted.new.text() == "new"
+
+
+def test_diff_of_a_large_page_only_reports_the_change(requests_mock):
+    rows = [f"<tr><td>{n}</td><td>{n * 2}</td></tr>" for n in range(2000)]
+    old = _page(requests_mock, f"<table>{''.join(rows)}</table>")
+    rows[1234] = "<tr><td>1234</td><td>0</td></tr>"
+    new = _page(requests_mock, f"<table>{''.join(rows)}</table>")
+
+    found = html.diff(old, new)
+
+    assert [(c.kind, c.old.text(), c.new.text()) for c in found] == [
+        ("changed", "2468", "0")
+    ]
+    assert old.find(".//table").fingerprint() != new.find(".//table").fingerprint()
+    assert old.find(".//tr").fingerprint() == new.find(".//tr").fingerprint()
@@ -0,0 +1,60 @@
+import pytest
+
+from activesoup import driver
+
+
+@pytest.mark.parametrize(
+    "headers,body",
+    [
+        (
+            {"Content-Type": "text/html; charset=windows-1252"},
+            "<html><body><p>café – ñ</p></body></html>".encode("cp1252"),
+        ),
+        (
+            {"Content-Type": "text/html; charset=ISO-8859-1"},
+            "<html><body><p>café – ñ</p></body></html>".encode("cp1252"),
+        ),
+        (
+            {"Content-Type": "text/html"},
+            '<html><head><meta charset="windows-1252"></head><body><p>café – ñ</p></body></html>'.encode(
+                "cp1252"
+            ),
+        ),
+        (
+            {"Content-Type": "text/html"},
+            b"\xef\xbb\xbf<html><body><p>caf\xc3\xa9 \xe2\x80\x93 \xc3\xb1</p></body></html>",
+        ),
+    ],
+)
+def test_page_is_decoded_using_declared_encoding(requests_mock, headers, body):
+    requests_mock.get("http://remote.test/", headers=headers, content=body)
+
+    page = driver.Driver().get("http://remote.test/")
+
+    assert page.p.text() == "café – ñ"
+
+
+def test_meta_charset_is_used_for_non_latin_pages(requests_mock):
+    body = '<html><head><meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS"></head><body><p>日本語</p></body></html>'
+    requests_mock.get(
+        "http://remote.test/",
+        headers={"Content-Type": "text/html"},
+        content=body.encode("shift_jis"),
+    )
+
+    page = driver.Driver().get("http://remote.test/")
+
+    assert page.p.text() == "日本語"
+
+
+def test_falls_back_to_sniffing_when_declared_encoding_is_wrong(requests_mock):
+    body = '<html><head><meta charset="windows-1252"></head><body><p>café</p></body></html>'
+    requests_mock.get(
+        "http://remote.test/",
+        headers={"Content-Type": "text/html; charset=utf-8"},
+        content=body.encode("cp1252"),
+    )
+
+    page = driver.Driver().get("http://remote.test/")
+
+    assert page.p.text() == "café"
@@ -0,0 +1,83 @@
+import gzip
+
+import pytest
+
+from activesoup import driver
+from activesoup.compression import ACCEPT_ENCODING, TransferStats
+
+_PAGE = b"<html><body><ul>" + b"<li>item</li>" * 5000 + b"</ul></body></html>"
+
+
+def _serve(requests_mock, url, body, encoding=None):
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    requests_mock.get(url, headers=headers, content=body)
+
+
+def test_every_supported_encoding_is_requested(requests_mock):
+    _serve(requests_mock, "http://remote.test/", _PAGE)
+
+    driver.Driver().get("http://remote.test/")
+
+    sent = requests_mock.last_request.headers["Accept-Encoding"]
+    assert sent == ACCEPT_ENCODING
+    assert {"gzip", "deflate"} <= {e.strip() for e in sent.split(",")}
+
+
+def test_custom_headers_keep_the_negotiated_encodings(requests_mock):
+    _serve(requests_mock, "http://remote.test/", _PAGE)
+
+    driver.Driver(headers={"User-Agent": "custom"}).get("http://remote.test/")
+    sent = requests_mock.last_request.headers
+    assert sent["User-Agent"] == "custom"
+    assert sent["Accept-Encoding"] == ACCEPT_ENCODING
+
+    driver.Driver(headers={"Accept-Encoding": "identity"}).get("http://remote.test/")
+    assert requests_mock.last_request.headers["Accept-Encoding"] == "identity"
+
+
+def test_compressed_pages_are_decoded_and_counted(requests_mock):
+    compressed = gzip.compress(_PAGE)
+    _serve(requests_mock, "http://remote.test/", compressed, encoding="gzip")
+    _serve(requests_mock, "http://remote.test/plain", _PAGE)
+
+    d = driver.Driver()
+    assert len(d.get("http://remote.test/").find_all("li")) == 5000
+    d.get("http://remote.test/plain")
+
+    stats = d.transfer_stats.hosts()["remote.test"]
+    assert stats.responses == 2
+    assert stats.wire_bytes == len(compressed) + len(_PAGE)
+    assert stats.body_bytes == 2 * len(_PAGE)
+    assert stats.encodings == {"gzip": 1, "identity": 1}
+    assert stats.ratio < 0.6
+
+
+def test_stats_can_be_shared(requests_mock):
+    _serve(requests_mock, "http://one.test/", _PAGE)
+    _serve(requests_mock, "http://two.test/", _PAGE)
+    stats = TransferStats()
+
+    d = driver.Driver(transfer_stats=stats)
+    d.get("http://one.test/")
+    d.fork().get("http://two.test/")
+    driver.Driver(transfer_stats=stats).get("http://two.test/")
+
+    assert {host: s.responses for host, s in stats.hosts().items()} == {
+        "one.test": 1,
+        "two.test": 2,
+    }
+    stats.clear()
+    assert stats.hosts() == {}
+
+
+def test_brotli_pages_are_decoded(requests_mock):
+    brotli = pytest.importorskip("brotli")
+    assert "br" in ACCEPT_ENCODING
+    compressed = brotli.compress(_PAGE)
+    _serve(requests_mock, "http://remote.test/", compressed, encoding="br")
+
+    d = driver.Driver()
+    assert len(d.get("http://remote.test/").find_all("li")) == 5000
+    assert d.transfer_stats.hosts()["remote.test"].wire_bytes == len(compressed)
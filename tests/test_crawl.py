@@ -0,0 +1,212 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from activesoup.compression import TransferStats
+from activesoup.crawl import Crawler
+from activesoup.driver import Driver
+
+
+def _page(*links):
+    anchors = "".join(f'<a href="{href}">{href}</a>' for href in links)
+    return f"<html><body>{anchors}</body></html>"
+
+
+@pytest.fixture
+def site(requests_mock):
+    pages = {
+        "/": _page("/a", "b", "http://elsewhere.test/"),
+        "/a": _page("/", "./c#fragment", "/a?y=2&x=1"),
+        "/a?x=1&y=2": _page(),
+        "/b": _page("/a?x=1&y=2"),
+        "/c": _page("/d"),
+    }
+    for path, body in pages.items():
+        requests_mock.get(
+            f"http://remote.test{path}",
+            headers={"Content-Type": "text/html"},
+            text=body,
+        )
+    requests_mock.get(
+        "http://remote.test/robots.txt", text="User-agent: *\nDisallow: /c\n"
+    )
+    return requests_mock
+
+
+def _crawl(**kwargs):
+    visited = []
+    crawler = Crawler(
+        ["http://remote.test/"],
+        on_page=lambda url, d: visited.append(url),
+        delay=0,
+        allowed_hosts={"remote.test"},
+        **kwargs,
+    )
+    crawler.run()
+    return crawler, visited
+
+
+def test_crawler_follows_links_once_each_and_honours_robots(site):
+    crawler, visited = _crawl(workers=3)
+
+    assert sorted(visited) == [
+        "http://remote.test/",
+        "http://remote.test/a",
+        "http://remote.test/a?x=1&y=2",
+        "http://remote.test/b",
+    ]
+    # /c is disallowed by robots.txt, so isn't counted
+    assert crawler.pages_crawled == 4
+
+
+def test_crawler_respects_max_depth(site):
+    _, visited = _crawl(max_depth=1, respect_robots=False)
+
+    assert sorted(visited) == [
+        "http://remote.test/",
+        "http://remote.test/a",
+        "http://remote.test/b",
+    ]
+
+
+def test_crawler_dedupes_with_bloom_filter(site):
+    _, visited = _crawl(bloom_capacity=1000)
+
+    assert len(visited) == len(set(visited)) == 4
+
+
+def test_crawl_can_resume_from_checkpoint(site, tmp_path):
+    checkpoint = str(tmp_path / "crawl.json")
+    _, first_visits = _crawl(
+        workers=1, max_pages=2, checkpoint=checkpoint, respect_robots=False
+    )
+    crawler, second_visits = _crawl(checkpoint=checkpoint, respect_robots=False)
+
+    assert len(first_visits) == 2
+    assert not set(first_visits) & set(second_visits)
+    assert len(first_visits) + len(second_visits) == 5
+    assert crawler.pages_crawled == 5
+
+
+def test_failed_pages_are_reported_and_not_counted(site):
+    errors = []
+    crawler, visited = _crawl(
+        respect_robots=False, on_error=lambda url, e: errors.append(url)
+    )
+
+    # /d isn't on the site
+    assert errors == ["http://remote.test/d"]
+    assert crawler.pages_failed == 1
+    assert crawler.pages_crawled == len(visited) == 5
+
+
+def test_failures_in_on_page_are_reported(site):
+    errors = []
+
+    def on_page(url, d):
+        if url == "http://remote.test/a":
+            raise ValueError("broken")
+
+    crawler = Crawler(
+        ["http://remote.test/"],
+        on_page=on_page,
+        on_error=lambda url, e: errors.append((url, type(e))),
+        delay=0,
+        allowed_hosts={"remote.test"},
+    )
+    crawler.run()
+
+    assert errors == [("http://remote.test/a", ValueError)]
+    assert crawler.pages_failed == 1
+    # The crawl carries on with the other pages
+    assert crawler.pages_crawled == 4
+
+
+class _ClosingDriver(Driver):
+    closed = 0
+
+    def __exit__(self, *exc):
+        type(self).closed += 1
+        return super().__exit__(*exc)
+
+
+def test_robots_txt_is_fetched_through_the_driver(site):
+    stats = TransferStats()
+
+    def new_driver():
+        return _ClosingDriver(transfer_stats=stats)
+
+    crawler = Crawler(
+        ["http://remote.test/"],
+        delay=0,
+        workers=2,
+        allowed_hosts={"remote.test"},
+        driver_factory=new_driver,
+    )
+    crawler.run()
+
+    # Four pages, and robots.txt
+    assert stats.hosts()["remote.test"].responses == 5
+    # The workers' Drivers, and the one that fetched robots.txt
+    assert _ClosingDriver.closed == 3
+
+
+def test_max_pages_counts_only_fetched_pages(site):
+    crawler, visited = _crawl(workers=1, max_pages=4)
+
+    assert crawler.pages_crawled == len(visited) == 4
+
+
+class _SlowRobotsAdapter(requests.adapters.BaseAdapter):
+    # requests_mock handles one request at a time, so can't show whether
+    # other hosts are held up; this serves requests concurrently instead
+    def __init__(self, release):
+        super().__init__()
+        self.release = release
+
+    def send(self, request, **kwargs):
+        if request.url == "http://slow.test/robots.txt":
+            self.release.wait(timeout=10)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        if request.url.endswith("/robots.txt"):
+            response._content = b""
+        else:
+            response.headers["Content-Type"] = "text/html"
+            response._content = _page().encode()
+        return response
+
+    def close(self):
+        pass
+
+
+def test_slow_robots_txt_only_holds_up_its_own_host():
+    release = threading.Event()
+
+    def new_driver():
+        d = Driver()
+        d.session.mount("http://", _SlowRobotsAdapter(release))
+        return d
+
+    def on_page(url, d):
+        if url == "http://remote.test/":
+            release.set()
+
+    crawler = Crawler(
+        ["http://slow.test/", "http://remote.test/"],
+        on_page=on_page,
+        workers=2,
+        delay=0,
+        driver_factory=new_driver,
+    )
+    started = time.monotonic()
+    crawler.run()
+
+    # The slow host's robots.txt is only answered once the other host's page
+    # has been fetched
+    assert time.monotonic() - started < 5
+    assert crawler.pages_crawled == 2
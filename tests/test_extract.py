@@ -0,0 +1,102 @@
+import pytest
+
+from activesoup import driver
+from activesoup.extract import compile_schema
+
+
+@pytest.fixture
+def articles_list_page(localwebserver):
+    d = driver.Driver()
+    yield d.get(
+        f"http://localhost:{localwebserver.port}/html/page_with_article_list.html"
+    )
+
+
+def test_extracts_fields_and_nested_records(articles_list_page):
+    data = articles_list_page.extract(
+        {
+            "description": "meta/@content",
+            "intro": "body p",
+            "section": {"id": "section#articles/@id", "class": "section/@class"},
+            "articles": [
+                "section.classy li.article",
+                {"title": "a", "href": "a/@href", "class": "@class"},
+            ],
+            "titles": ["li a/text()"],
+            "missing": "table",
+        }
+    )
+
+    assert data == {
+        "description": "A page with an IE-8 compat shim",
+        "intro": "some body text",
+        "section": {"id": "articles", "class": "classy"},
+        "articles": [
+            {
+                "title": f"article{n}",
+                "href": f"https://example.com/article{n}",
+                "class": "article",
+            }
+            for n in (1, 2, 3)
+        ],
+        "titles": ["article1", "article2", "article3"],
+        "missing": None,
+    }
+
+
+def test_compiled_plan_can_be_reused(articles_list_page):
+    plan = compile_schema({"links": ["a/@href"]})
+
+    section = articles_list_page.find(id="articles")
+    assert section.extract(plan) == articles_list_page.extract(plan)
+    assert len(section.extract(plan)["links"]) == 3
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [
+        {"field": 1},
+        {"field": ["li", "a"]},
+        {"field": ["li/@class", {"a": "a"}]},
+        {"field": "li..item"},
+        {"field": "li/@"},
+    ],
+)
+def test_invalid_schemas_are_rejected(schema):
+    with pytest.raises(ValueError):
+        compile_schema(schema)
+
+
+def _nested_page(requests_mock, body):
+    requests_mock.get(
+        "http://remote.test/",
+        headers={"Content-Type": "text/html; charset=utf-8"},
+        text=f"<html><body>{body}</body></html>",
+    )
+    return driver.Driver().get("http://remote.test/")
+
+
+def test_nested_matching_ancestors_dont_duplicate_matches(requests_mock):
+    depth = 30
+    body = "<p>outside</p>"
+    body += "".join(f"<div><p>p{n}</p>" for n in range(depth)) + "</div>" * depth
+    page = _nested_page(requests_mock, body)
+
+    data = page.extract({"ps": ["div p"], "first": "div div p"})
+
+    expected = [p.text() for p in page.find_all("div//p")]
+    expected = list(dict.fromkeys(expected))  # ElementTree repeats them too
+    assert data["ps"] == expected == [f"p{n}" for n in range(depth)]
+    assert data["first"] == "p1"
+
+
+def test_nested_matching_ancestors_dont_duplicate_record_fields(requests_mock):
+    page = _nested_page(
+        requests_mock,
+        '<ul><li><div><div><a href="/1">one</a></div></div></li>'
+        '<li><div><a href="/2">two</a><div><a href="/3">three</a></div></div></li></ul>',
+    )
+
+    data = page.extract({"rows": ["li", {"links": ["div a/@href"]}]})
+
+    assert data == {"rows": [{"links": ["/1"]}, {"links": ["/2", "/3"]}]}
@@ -1,4 +1,10 @@
+import io
+
+import pytest
+import requests
+
 from activesoup import driver
+from activesoup.multipart import MultipartBody
 
 
 def test_form_submission_includes_form_fields_which_arent_specified(localwebserver):
@@ -58,3 +64,80 @@ def test_submits_checked_checkboxes_and_selected_radios(localwebserver):
         "checkbox-field-1": ["label-1", "label-2", "label-3"],
         "radio-field-1": "label-1",
     }
+
+
+def test_multipart_form_uploads_file_from_path(localwebserver, tmp_path):
+    upload = tmp_path / "notes.txt"
+    upload.write_text("file-content")
+
+    d = driver.Driver()
+    page = d.get(
+        f"http://localhost:{localwebserver.port}/html/page_with_file_upload.html"
+    )
+    result = page.form.submit({"description": "some notes", "upload": str(upload)})
+
+    assert result._raw_response.json() == {
+        "some-hidden-field": "5",
+        "description": "some notes",
+        "upload": {"filename": "notes.txt", "content": "file-content"},
+    }
+
+
+def test_multipart_form_uploads_file_object(localwebserver, tmp_path):
+    upload = tmp_path / "notes.txt"
+    upload.write_text("file-content")
+
+    d = driver.Driver()
+    page = d.get(
+        f"http://localhost:{localwebserver.port}/html/page_with_file_upload.html"
+    )
+    with open(upload, "rb") as f:
+        result = page.form.submit({"upload": f}, suppress_unspecified=True)
+
+    assert result._raw_response.json() == {
+        "upload": {"filename": "notes.txt", "content": "file-content"},
+    }
+
+
+def test_multipart_body_streams_files_in_chunks(tmp_path):
+    upload = tmp_path / "large.bin"
+    upload.write_bytes(b"x" * 100_000)
+
+    body = MultipartBody([("upload", upload)], chunk_size=4096)
+    chunks = list(body)
+
+    assert max(len(c) for c in chunks) == 4096
+    assert sum(len(c) for c in chunks) == len(body)
+
+
+@pytest.mark.parametrize("code", [307, 308])
+def test_multipart_body_is_resent_after_body_preserving_redirect(
+    localwebserver, tmp_path, code
+):
+    upload = tmp_path / "notes.txt"
+    upload.write_text("file-content")
+    body = MultipartBody([("description", "some notes"), ("upload", upload)])
+
+    response = requests.post(
+        f"http://localhost:{localwebserver.port}/moved/upload?code={code}",
+        data=body,
+        headers={"Content-Type": body.content_type},
+        timeout=10,
+    )
+
+    assert response.history[0].status_code == code
+    assert response.json() == {
+        "description": "some notes",
+        "upload": {"filename": "notes.txt", "content": "file-content"},
+    }
+
+
+def test_multipart_body_can_only_be_rewound_to_the_start():
+    body = MultipartBody([("name", "value")], boundary="b")
+    start = body.read(5)
+    body.read()
+
+    assert body.seek(0) == 0
+    assert body.read(5) == start
+    with pytest.raises(io.UnsupportedOperation):
+        body.seek(2)
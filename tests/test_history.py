@@ -0,0 +1,105 @@
+import pytest
+
+from activesoup import driver
+
+
+@pytest.fixture
+def site(requests_mock):
+    for n in range(1, 4):
+        requests_mock.get(
+            f"http://remote.test/{n}",
+            headers={"Content-Type": "text/html"},
+            text=f"<html><body><p>page {n}</p>{'x' * 1000}</body></html>",
+        )
+    return requests_mock
+
+
+def test_back_and_forward_reuse_parsed_pages(site):
+    d = driver.Driver()
+    first = d.get("http://remote.test/1").last_response
+    d.get("http://remote.test/2")
+
+    assert d.back().last_response is first
+    assert d.body.p.text() == "page 1"
+    assert d.forward().body.p.text() == "page 2"
+    assert site.call_count == 2
+
+
+def test_navigating_after_back_discards_forward_pages(site):
+    d = driver.Driver()
+    d.get("http://remote.test/1")
+    d.get("http://remote.test/2")
+    d.back()
+    d.get("http://remote.test/3")
+
+    with pytest.raises(driver.DriverError):
+        d.forward()
+    assert d.back().url == "http://remote.test/1"
+
+
+def test_history_depth_is_bounded(site):
+    d = driver.Driver(history_depth=2)
+    for n in range(1, 4):
+        d.get(f"http://remote.test/{n}")
+
+    d.back()
+    with pytest.raises(driver.DriverError):
+        d.back()
+
+
+def test_evicted_pages_are_reparsed_without_refetching(site):
+    d = driver.Driver(history_bytes=12000)
+    first = d.get("http://remote.test/1").last_response
+    d.get("http://remote.test/2")
+
+    d.back()
+    assert d.last_response is not first
+    assert d.body.p.text() == "page 1"
+    assert site.call_count == 2
+
+
+def test_fully_evicted_pages_are_refetched(site):
+    d = driver.Driver(history_bytes=0)
+    d.get("http://remote.test/1")
+    d.get("http://remote.test/2")
+
+    assert d.back().body.p.text() == "page 1"
+    assert site.call_count == 3
+
+
+def test_evicted_form_results_are_not_resubmitted(site):
+    site.get(
+        "http://remote.test/form",
+        headers={"Content-Type": "text/html"},
+        text='<form method="post" action="/submit"><input name="q" value="1"></form>',
+    )
+    site.post(
+        "http://remote.test/submit",
+        headers={"Content-Type": "text/html"},
+        text="<p>submitted</p>",
+    )
+    d = driver.Driver(history_bytes=0)
+    d.get("http://remote.test/form").form.submit({})
+    d.get("http://remote.test/2")
+
+    with pytest.raises(driver.DriverError, match="POST"):
+        d.back()
+    assert site.call_count == 3
+    # The Driver stays on the page it was on
+    assert d.body.p.text() == "page 2"
+    with pytest.raises(driver.DriverError, match="POST"):
+        d.back()
+
+
+def test_restore_clears_history(site):
+    d = driver.Driver()
+    d.get("http://remote.test/1")
+    state = d.snapshot()
+    d.get("http://remote.test/2")
+
+    d.restore(state)
+    with pytest.raises(driver.DriverError):
+        d.back()
+    d.get("http://remote.test/3")
+    with pytest.raises(driver.DriverError):
+        d.back()
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+import textwrap
+
+
+def _run(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stdout.strip()
+
+
+def test_importing_activesoup_does_not_load_dependencies():
+    loaded = _run("""
+        import sys
+        import activesoup
+        print(",".join(m for m in ("requests", "html5lib") if m in sys.modules))
+        """)
+    assert loaded == ""
+
+
+def test_html5lib_is_only_loaded_to_parse_html():
+    loaded = _run("""
+        import sys
+        import requests
+        import activesoup
+
+        def response(content_type, body):
+            r = requests.Response()
+            r._content = body
+            r.headers["Content-Type"] = content_type
+            return r
+
+        d = activesoup.Driver()
+        d.content_resolver.resolve(response("application/json", b'{"a": 1}'))
+        print("html5lib" in sys.modules)
+        d.content_resolver.resolve(response("text/html", b"<p>hi</p>"))
+        print("html5lib" in sys.modules)
+        """)
+    assert loaded.split() == ["False", "True"]
+
+
+def test_lazy_exports():
+    import activesoup
+    from activesoup.driver import Driver
+    from activesoup.response import Response
+
+    assert activesoup.Driver is Driver
+    assert activesoup.Response is Response
+    assert "Driver" in dir(activesoup)
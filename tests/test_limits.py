@@ -0,0 +1,103 @@
+import gzip
+
+import pytest
+
+from activesoup import driver
+
+
+def _serve(requests_mock, body, headers=None):
+    requests_mock.get(
+        "http://remote.test/",
+        headers={"Content-Type": "text/html; charset=utf-8", **(headers or {})},
+        content=body,
+    )
+
+
+def test_pages_within_limits_are_parsed(requests_mock):
+    _serve(requests_mock, b"<html><body><div><p>hi</p></div></body></html>")
+    d = driver.Driver(max_body_bytes=1024, max_nodes=10, max_depth=10, parse_timeout=10)
+
+    assert d.get("http://remote.test/").p.text() == "hi"
+    assert (
+        d.last_response.html()
+        == b"<html><head></head><body><div><p>hi</p></div></body></html>"
+    )
+
+
+def test_declared_body_size_is_checked_before_reading(requests_mock):
+    _serve(requests_mock, b"<p>small</p>", headers={"Content-Length": "999999"})
+
+    with pytest.raises(driver.BodyTooLarge):
+        driver.Driver(max_body_bytes=1000).get("http://remote.test/")
+
+
+def test_body_size_is_checked_while_streaming(requests_mock):
+    _serve(requests_mock, b"<p>" + b"x" * 200_000 + b"</p>")
+
+    with pytest.raises(driver.BodyTooLarge):
+        driver.Driver(max_body_bytes=100_000).get("http://remote.test/")
+
+
+def test_body_size_limit_applies_after_decompression(requests_mock):
+    _serve(
+        requests_mock,
+        gzip.compress(b"<p>" + b"x" * 200_000 + b"</p>"),
+        headers={"Content-Encoding": "gzip"},
+    )
+
+    with pytest.raises(driver.BodyTooLarge):
+        driver.Driver(max_body_bytes=100_000).get("http://remote.test/")
+
+
+def test_too_many_nodes(requests_mock):
+    _serve(requests_mock, b"<ul>" + b"<li>x</li>" * 1000 + b"</ul>")
+
+    with pytest.raises(driver.TooManyNodes):
+        driver.Driver(max_nodes=500).get("http://remote.test/")
+
+
+def test_too_deep(requests_mock):
+    _serve(requests_mock, b"<div>" * 200 + b"x")
+
+    with pytest.raises(driver.TooDeep):
+        driver.Driver(max_depth=100).get("http://remote.test/")
+
+
+def test_parse_timeout(requests_mock):
+    _serve(requests_mock, b"<ul>" + b"<li>x</li>" * 1000 + b"</ul>")
+
+    with pytest.raises(driver.ParseTimeout):
+        driver.Driver(parse_timeout=0).get("http://remote.test/")
+
+
+def test_limits_are_driver_errors():
+    assert issubclass(driver.ParseTimeout, driver.ResourceLimitExceeded)
+    assert issubclass(driver.ResourceLimitExceeded, driver.DriverError)
+
+
+def test_deeply_nested_pages_can_be_parsed(requests_mock):
+    _serve(requests_mock, b"<div>" * 3000 + b"deep")
+
+    page = driver.Driver().get("http://remote.test/")
+
+    assert page.text_content() == "deep"
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        # The div and spans are foster-parented out of the table
+        b"<table><div><span>a</span><span>b</span></div></table>",
+        b"<table><tr><td><div><span>a</span></div></td></tr></table>",
+    ],
+)
+def test_table_content_is_counted_once(requests_mock, body):
+    _serve(requests_mock, body)
+    page = driver.Driver().get("http://remote.test/")
+    # Everything but the <html> element, which is created before parsing starts
+    nodes = sum(1 for _ in page.etree().iter()) - 1
+
+    d = driver.Driver(max_nodes=nodes)
+    assert d.get("http://remote.test/").html() == page.html()
+    with pytest.raises(driver.TooManyNodes):
+        driver.Driver(max_nodes=nodes - 1).get("http://remote.test/")
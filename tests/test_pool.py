@@ -0,0 +1,193 @@
+import threading
+import time
+
+import pytest
+
+from activesoup import driver
+from activesoup.pool import DriverPool, PoolExhausted
+
+
+@pytest.fixture
+def site(requests_mock):
+    requests_mock.get(
+        "http://remote.test/login",
+        headers={"Content-Type": "text/html"},
+        text="<p>welcome</p>",
+    )
+    requests_mock.get(
+        "http://remote.test/page",
+        headers={"Content-Type": "text/html"},
+        text="<p>page</p>",
+    )
+    return requests_mock
+
+
+def _login(d):
+    d.get("http://remote.test/login")
+    # requests_mock doesn't feed Set-Cookie back into the session
+    d.session.cookies.set("session", "secret", domain="remote.test", path="/")
+    d.session.headers["X-Token"] = "abc"
+
+
+def test_drivers_are_reused_and_reset(site):
+    pool = DriverPool(setup=_login)
+
+    with pool.driver() as d:
+        assert d.url is None
+        assert d.session.cookies["session"] == "secret"
+        d.get("http://remote.test/page")
+        d.session.cookies.set("tracking", "1", domain="remote.test", path="/")
+        d.session.headers["X-Job"] = "1"
+        first = d
+
+    with pool.driver() as d:
+        assert d is first
+        assert d.url is None
+        assert d.history.current is None
+        assert d.session.cookies.get_dict() == {"session": "secret"}
+        assert d.session.headers["X-Token"] == "abc"
+        assert "X-Job" not in d.session.headers
+
+    assert pool.size == 1
+    assert site.call_count == 2
+
+
+def test_response_hooks_added_while_checked_out_are_removed(site):
+    seen = []
+
+    def setup(d):
+        d.add_response_hook(lambda r: seen.append(("setup", r.url)))
+
+    pool = DriverPool(setup=setup)
+    with pool.driver() as d:
+        d.add_response_hook(lambda r: seen.append(("job", r.url)))
+        d.get("http://remote.test/page")
+        first = d
+
+    seen.clear()
+    with pool.driver() as d:
+        assert d is first
+        d.get("http://remote.test/page")
+    assert seen == [("setup", "http://remote.test/page")]
+
+
+def test_max_size_is_enforced(site):
+    pool = DriverPool(max_size=2, timeout=0.05)
+    a, b = pool.checkout(), pool.checkout()
+
+    with pytest.raises(PoolExhausted):
+        pool.checkout()
+
+    released = threading.Timer(0.05, pool.checkin, (a,))
+    released.start()
+    assert pool.checkout(timeout=5) is a
+    released.join()
+    assert pool.size == 2
+    pool.checkin(b)
+
+
+class _SlowResetDriver(driver.Driver):
+    resetting = threading.Event()
+    release = threading.Event()
+    block = False
+
+    def reset(self):
+        if self.block:
+            self.resetting.set()
+            self.release.wait(timeout=10)
+        return super().reset()
+
+
+def test_pool_stays_within_max_size_while_drivers_are_reset(site):
+    created = []
+
+    def factory():
+        d = _SlowResetDriver()
+        created.append(d)
+        return d
+
+    pool = DriverPool(factory=factory, max_size=1)
+    first = pool.checkout()
+    first.block = True
+    checkin = threading.Thread(target=pool.checkin, args=(first,))
+    checkin.start()
+    assert first.resetting.wait(timeout=10)
+
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.checkout(timeout=10)))
+    waiter.start()
+    time.sleep(0.1)
+    assert pool.size <= pool.max_size
+    assert len(created) == 1
+
+    first.block = False
+    first.release.set()
+    checkin.join()
+    waiter.join()
+    # The warm Driver was handed on, rather than a new one being made
+    assert got == [first]
+    assert len(created) == 1
+
+
+def test_idle_drivers_are_evicted(site):
+    pool = DriverPool(idle_timeout=0.01)
+    with pool.driver() as first:
+        pass
+    assert pool.idle == 1
+
+    time.sleep(0.05)
+    with pool.driver() as d:
+        assert d is not first
+    assert pool.size == 1
+
+
+def test_unhealthy_drivers_are_replaced(site):
+    healthy = {"ok": True}
+    pool = DriverPool(health_check=lambda d: healthy["ok"])
+    with pool.driver() as first:
+        pass
+
+    healthy["ok"] = False
+    with pool.driver() as d:
+        assert d is not first
+    assert pool.size == 1
+
+
+def test_discarded_drivers_are_not_reused(site):
+    pool = DriverPool()
+    first = pool.checkout()
+    pool.checkin(first, discard=True)
+
+    assert pool.size == 0
+    assert pool.checkout() is not first
+
+
+def test_failed_setup_does_not_take_a_slot(site):
+    def broken(d):
+        raise RuntimeError("login failed")
+
+    pool = DriverPool(setup=broken, max_size=1)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            pool.checkout()
+    assert pool.size == 0
+
+
+def test_prewarm_and_close(site):
+    pool = DriverPool(setup=_login, max_size=3)
+    pool.prewarm(5)
+    assert pool.idle == 3
+    assert site.call_count == 3
+
+    d = pool.checkout()
+    pool.close()
+    assert pool.size == 1
+    pool.checkin(d)
+    assert pool.size == 0
+    with pytest.raises(driver.DriverError):
+        pool.checkout()
+
+
+def test_only_checked_out_drivers_can_be_checked_in():
+    with pytest.raises(ValueError):
+        DriverPool().checkin(driver.Driver())
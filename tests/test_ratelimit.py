@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from activesoup import driver
+from activesoup.ratelimit import RateLimiter, _retry_after
+
+
+def _response(status, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r.headers.update(headers or {})
+    return r
+
+
+def test_rate_is_limited_per_host():
+    limiter = RateLimiter(rate=20)
+
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.release(limiter.acquire("http://a.test/"), _response(200))
+    elapsed = time.monotonic() - start
+
+    assert elapsed >= 0.19
+    # Another host has its own bucket
+    start = time.monotonic()
+    limiter.release(limiter.acquire("http://b.test/"), _response(200))
+    assert time.monotonic() - start < 0.05
+
+
+def test_concurrency_is_limited_across_threads():
+    limiter = RateLimiter(max_concurrency=1)
+    ticket = limiter.acquire("http://a.test/x")
+    acquired = threading.Event()
+
+    def other():
+        limiter.release(limiter.acquire("http://a.test/y"), _response(200))
+        acquired.set()
+
+    t = threading.Thread(target=other)
+    t.start()
+    assert not acquired.wait(0.1)
+    limiter.release(ticket, _response(200))
+    assert acquired.wait(1)
+    t.join()
+
+
+def test_limits_increase_on_success_and_back_off_on_overload():
+    limiter = RateLimiter(rate=100, max_concurrency=4)
+    for _ in range(50):
+        limiter.release(limiter.acquire("http://a.test/"), _response(200))
+    limits = limiter.limits()["a.test"]
+    assert limits.concurrency == 4
+    assert limits.rate == 100
+    assert limits.in_flight == 0
+
+    limiter.release(
+        limiter.acquire("http://a.test/"), _response(429, {"Retry-After": "30"})
+    )
+
+    limits = limiter.limits()["a.test"]
+    assert limits.concurrency == 2
+    assert limits.rate == 50
+    assert 29 < limits.retry_after <= 30
+    assert limits.error_rate > 0
+
+
+def test_failed_requests_back_off():
+    limiter = RateLimiter(max_concurrency=4)
+    for _ in range(50):
+        limiter.release(limiter.acquire("http://a.test/"), _response(200))
+
+    limiter.release(limiter.acquire("http://a.test/"), failed=True)
+
+    assert limiter.limits()["a.test"].concurrency == 2
+
+
+def test_retry_after_as_http_date():
+    when = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+
+    assert 55 < _retry_after(_response(503, {"Retry-After": when})) <= 60
+
+
+def test_driver_requests_go_through_the_limiter(requests_mock):
+    requests_mock.get(
+        "http://remote.test/busy",
+        status_code=503,
+        headers={"Retry-After": "1", "Content-Type": "application/json"},
+        text="{}",
+    )
+    requests_mock.get("http://remote.test/down", exc=requests.ConnectionError)
+    limiter = RateLimiter()
+    d = driver.Driver(rate_limiter=limiter)
+
+    d.get("http://remote.test/busy")
+    assert limiter.limits()["remote.test"].retry_after > 0.9
+    start = time.monotonic()
+    with pytest.raises(requests.ConnectionError):
+        d.get("http://remote.test/down")
+    assert time.monotonic() - start > 0.9
+
+    limits = limiter.limits()["remote.test"]
+    assert limits.in_flight == 0
+    assert limits.error_rate > 0.3
@@ -0,0 +1,99 @@
+import io
+
+import pytest
+
+from activesoup import driver, serialize
+
+
+def _page(requests_mock, body):
+    requests_mock.get(
+        "http://remote.test/",
+        headers={"Content-Type": "text/html; charset=utf-8"},
+        content=body.encode("utf-8"),
+    )
+    return driver.Driver().get("http://remote.test/")
+
+
+@pytest.mark.parametrize(
+    "body,expected",
+    [
+        ("<p>a<br>b<img src=x.png></p>", '<p>a<br>b<img src="x.png"></p>'),
+        (
+            "<p>1 &lt; 2 &amp;&amp; 3 &gt; 2&nbsp;!</p>",
+            "<p>1 &lt; 2 &amp;&amp; 3 &gt; 2&nbsp;!</p>",
+        ),
+        (
+            "<p title='say \"hi\" &amp; go'>x</p>",
+            '<p title="say &quot;hi&quot; &amp; go">x</p>',
+        ),
+        (
+            "<p><script>if (a < b && c) {}</script></p>",
+            "<p><script>if (a < b && c) {}</script></p>",
+        ),
+        ("<p><!-- note --></p>", "<p><!-- note --></p>"),
+        ("<p>café</p>", "<p>café</p>"),
+    ],
+)
+def test_html_is_serialized_as_html(requests_mock, body, expected):
+    page = _page(requests_mock, f"<html><body>{body}</body></html>")
+
+    assert page.find(".//p").html() == expected.encode("utf-8")
+
+
+def test_foreign_elements_keep_their_local_names(requests_mock):
+    page = _page(
+        requests_mock,
+        '<html><body><div><svg><use xlink:href="#a"></use></svg></div></body></html>',
+    )
+
+    assert (
+        page.find(".//div").html()
+        == b'<div><svg><use xlink:href="#a"></use></svg></div>'
+    )
+
+
+def test_text_after_the_element_is_not_included(requests_mock):
+    page = _page(requests_mock, "<html><body><p>one</p>two</body></html>")
+
+    assert page.find(".//p").html() == b"<p>one</p>"
+
+
+def test_pretty_output_leaves_text_alone(requests_mock):
+    page = _page(
+        requests_mock,
+        "<html><body><ul><li>one</li><li>t<b>w</b>o</li></ul><pre>\n\n x</pre></body></html>",
+    )
+
+    assert page.find(".//body").html(pretty=True).decode() == (
+        "<body>\n"
+        "  <ul>\n"
+        "    <li>one</li>\n"
+        "    <li>t<b>w</b>o</li>\n"
+        "  </ul>\n"
+        "  <pre>\n\n x</pre>\n"
+        "</body>"
+    )
+
+
+def test_write_html_matches_html(requests_mock):
+    rows = "".join(f"<tr><td>{n}</td><td>row &amp; {n}</td></tr>" for n in range(5000))
+    page = _page(requests_mock, f"<html><body><table>{rows}</table></body></html>")
+
+    as_bytes = io.BytesIO()
+    page.write_html(as_bytes)
+    as_text = io.StringIO()
+    page.write_html(as_text, encoding=None)
+
+    assert as_bytes.getvalue() == page.html()
+    assert as_text.getvalue() == page.html().decode("utf-8")
+
+
+def test_iter_html_yields_chunks(requests_mock):
+    rows = "".join(f"<p>{n}</p>" for n in range(1000))
+    page = _page(requests_mock, f"<html><body>{rows}</body></html>")
+
+    chunks = list(serialize.iter_html(page.etree(), chunk_size=100))
+
+    assert len(chunks) > 10
+    assert all(len(c) < 200 for c in chunks)
+    assert "".join(chunks) == "".join(page.iter_html())
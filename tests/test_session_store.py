@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from activesoup import driver
+from activesoup.session_store import FileSessionStore, SqliteSessionStore
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "file":
+        return FileSessionStore(tmp_path / "session.json")
+    return SqliteSessionStore(tmp_path / "sessions.db")
+
+
+def _login(d):
+    d.get("http://remote.test/login")
+    # requests_mock doesn't feed Set-Cookie back into the session, so we
+    # act as the server would
+    d.session.cookies.set("session", "abc123", domain="remote.test", path="/")
+
+
+def _mock_site(requests_mock):
+    requests_mock.get(
+        "http://remote.test/login",
+        headers={"Content-Type": "text/html"},
+        text="<html><body>logged in</body></html>",
+    )
+    requests_mock.get(
+        "http://remote.test/private",
+        request_headers={"Cookie": "session=abc123"},
+        headers={"Content-Type": "text/html"},
+        text="<html><body>secret</body></html>",
+    )
+
+
+def test_saved_session_can_be_restored_by_another_driver(store, requests_mock):
+    _mock_site(requests_mock)
+
+    d = driver.Driver(headers={"X-Client": "worker"})
+    _login(d)
+    d.save_session(store)
+
+    restored = driver.Driver()
+    assert restored.load_session(store)
+    assert restored.url == "http://remote.test/login"
+    assert restored.session.headers["X-Client"] == "worker"
+
+    page = restored.get("./private")
+    assert page.body.text() == "secret"
+
+
+def test_login_only_happens_when_no_session_is_stored(store, requests_mock):
+    _mock_site(requests_mock)
+    logins = []
+
+    def login(d):
+        logins.append(d)
+        _login(d)
+
+    first, second = driver.Driver(), driver.Driver()
+    assert not first.load_session(store, login=login)
+    assert second.load_session(store, login=login)
+
+    assert logins == [first]
+    assert second.get("http://remote.test/private").body.text() == "secret"
+
+
+def test_loading_from_empty_store_without_login_leaves_driver_unchanged(store):
+    d = driver.Driver()
+
+    assert not d.load_session(store)
+    assert d.url is None
+
+
+def test_lock_can_be_reentered_by_the_same_thread(store):
+    def nested():
+        with store.lock():
+            with store.lock():
+                store.save({"cookies": []})
+            store.load()
+
+    # Run in a thread, so that a deadlock fails the test rather than hanging it
+    t = threading.Thread(target=nested, daemon=True)
+    t.start()
+    t.join(timeout=10)
+    assert not t.is_alive()
+    assert store.load() == {"cookies": []}
+
+
+def test_lock_excludes_other_threads_until_the_outermost_release(store):
+    held, release, acquired = threading.Event(), threading.Event(), threading.Event()
+
+    def holder():
+        with store.lock():
+            with store.lock():
+                pass
+            held.set()
+            release.wait(timeout=10)
+
+    def other():
+        with store.lock():
+            acquired.set()
+
+    threading.Thread(target=holder, daemon=True).start()
+    assert held.wait(timeout=10)
+    threading.Thread(target=other, daemon=True).start()
+    assert not acquired.wait(timeout=0.2)
+    release.set()
+    assert acquired.wait(timeout=10)
@@ -0,0 +1,37 @@
+import pytest
+
+from activesoup import driver
+
+
+@pytest.fixture
+def table_page(localwebserver):
+    d = driver.Driver()
+    yield d.get(f"http://localhost:{localwebserver.port}/html/page_with_table.html")
+
+
+def test_links_are_resolved_against_page_url(table_page, localwebserver):
+    assert table_page.links() == [
+        f"http://localhost:{localwebserver.port}/html/invoices/1234",
+        f"http://localhost:{localwebserver.port}/html/invoices/1235",
+        "https://example.com/help",
+    ]
+
+
+def test_table_rows_include_head_and_body(table_page):
+    table = table_page.find(id="invoices")
+
+    assert table.table_rows() == [
+        ("Invoice", "Customer", "Total"),
+        ("1234", "Acme Corp", "10.00"),
+        ("1235", "Widgets Ltd", "25.50"),
+    ]
+
+
+def test_table_records_are_keyed_by_header(table_page):
+    table = table_page.find(id="invoices")
+
+    assert table.to_records() == [
+        {"Invoice": "1234", "Customer": "Acme Corp", "Total": "10.00"},
+        {"Invoice": "1235", "Customer": "Widgets Ltd", "Total": "25.50"},
+    ]
+    assert table.to_records(columnar=True)["Total"] == ["10.00", "25.50"]
@@ -0,0 +1,127 @@
+"""
+Stress tests for sharing pages and Drivers between threads. These are most
+meaningful on a free-threaded (no-GIL) build of CPython, but the switch
+interval is turned right down so that threads interleave as much as
+possible on a regular build too.
+"""
+
+import sys
+import threading
+
+import pytest
+
+from activesoup import driver, html
+
+_THREADS = 8
+
+_BODY = "".join(
+    f'<li class="item" id="i{n}"><a href="/item/{n}">Item {n}</a> <b>{n % 7}</b></li>'
+    for n in range(300)
+)
+_PAGE = f"<html><head><base href='http://remote.test/shop/'></head><body><ul>{_BODY}</ul></body></html>"
+
+
+@pytest.fixture(autouse=True)
+def fast_switching():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _run_in_threads(fn, threads=_THREADS):
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+    errors = []
+
+    def run(i):
+        try:
+            barrier.wait()
+            results[i] = fn(i)
+        except BaseException as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def _queries(page):
+    return (
+        page.links()[::50],
+        [li["id"] for li in page.find_all("li")[::30]],
+        page.find(".//li", id="i42").text_content(),
+        [t.text_content() for t in page.find_by_text("Item 29")],
+        page.find(".//ul").fingerprint(),
+        page.extract({"items": ["li.item", {"n": "b"}]})["items"][-1],
+        page.ul.li.a["href"],
+    )
+
+
+def _page(requests_mock):
+    requests_mock.get(
+        "http://remote.test/",
+        headers={"Content-Type": "text/html; charset=utf-8"},
+        text=_PAGE,
+    )
+    return driver.Driver().get("http://remote.test/").last_response
+
+
+@pytest.mark.parametrize("freeze", [False, True])
+def test_one_page_can_be_queried_from_many_threads(requests_mock, freeze):
+    expected = _queries(_page(requests_mock))
+    page = _page(requests_mock)
+    if freeze:
+        page.freeze()
+
+    results = _run_in_threads(lambda i: [_queries(page) for _ in range(5)])
+
+    assert all(r == expected for thread in results for r in thread)
+
+
+def test_threads_get_the_same_bound_tags(requests_mock):
+    page = _page(requests_mock)
+
+    found = _run_in_threads(lambda i: (page.find(".//li", id="i7"), page.ul))
+
+    assert all(f[0] is found[0][0] and f[1] is found[0][1] for f in found)
+
+
+def test_each_thread_navigates_its_own_fork(requests_mock):
+    for n in range(_THREADS):
+        requests_mock.get(
+            f"http://remote.test/page/{n}",
+            headers={"Content-Type": "text/html"},
+            text=f"<html><body><h1>Page {n}</h1><a href='next'>next</a></body></html>",
+        )
+        requests_mock.get(
+            "http://remote.test/page/next",
+            headers={"Content-Type": "text/html"},
+            text="<html><body><h1>Next</h1></body></html>",
+        )
+    d = driver.Driver(headers={"User-Agent": "shared"})
+
+    def navigate(i):
+        local = d.local()
+        seen = []
+        for _ in range(20):
+            local.get(f"http://remote.test/page/{i}")
+            seen.append(local.h1.text())
+            seen.append(local.a["href"])
+        assert local is d.local()
+        return local, seen
+
+    results = _run_in_threads(navigate)
+
+    for i, (local, seen) in enumerate(results):
+        assert local.session is d.session
+        assert local.session.headers["User-Agent"] == "shared"
+        assert seen == [f"Page {i}", "next"] * 20
+    assert len({id(local) for local, _ in results}) == _THREADS
+    # The original Driver never left its starting point
+    assert d.url is None
@@ -0,0 +1,161 @@
+import datetime
+import gzip
+import json
+
+import requests
+import requests_mock
+
+from activesoup import cassette, driver
+from activesoup.warc import WarcReader, WarcWriter
+
+
+def _mock_site(requests_mock):
+    requests_mock.get(
+        "http://remote.test/page",
+        headers={"Content-Type": "text/html; charset=utf-8"},
+        text="<html><body><p>archived café</p></body></html>",
+    )
+    requests_mock.get(
+        "http://remote.test/data",
+        headers={"Content-Type": "application/json"},
+        text='{"key": "value"}',
+    )
+
+
+def test_archived_responses_can_be_reloaded(requests_mock, tmp_path):
+    _mock_site(requests_mock)
+
+    with WarcWriter(tmp_path) as archive:
+        d = driver.Driver()
+        d.add_response_hook(archive)
+        d.get("http://remote.test/page")
+        d.get("http://remote.test/data")
+
+    reader = WarcReader(archive.paths)
+    assert [r.url for r in reader] == [
+        "http://remote.test/page",
+        "http://remote.test/data",
+    ]
+
+    page = reader.load(reader.latest("http://remote.test/page"))
+    assert page.p.text() == "archived café"
+    assert reader.load(reader.latest("http://remote.test/data"))["key"] == "value"
+    assert reader.latest("http://remote.test/other") is None
+
+
+def test_forms_on_archived_pages_can_be_submitted(requests_mock, tmp_path):
+    requests_mock.get(
+        "http://remote.test/search/",
+        headers={"Content-Type": "text/html"},
+        text='<form method="get" action="results"><input name="q" value="x"></form>'
+        '<form id="here" method="post"><input name="p" value="y"></form>',
+    )
+    requests_mock.get(
+        "http://remote.test/search/results",
+        headers={"Content-Type": "application/json"},
+        text='{"searched": true}',
+    )
+    requests_mock.post(
+        "http://remote.test/search/",
+        headers={"Content-Type": "application/json"},
+        text='{"posted": true}',
+    )
+    with WarcWriter(tmp_path) as archive:
+        d = driver.Driver()
+        d.add_response_hook(archive)
+        d.get("http://remote.test/search/")
+
+    reader = WarcReader(archive.paths)
+    page = reader.load(reader.latest("http://remote.test/search/"))
+    assert page.form.submit({})["searched"] is True
+    assert requests_mock.last_request.url == "http://remote.test/search/results"
+
+    page = reader.load(reader.latest("http://remote.test/search/"))
+    assert page.find('.//form[@id="here"]').submit({})["posted"] is True
+    assert requests_mock.last_request.text == "p=y"
+
+
+def test_archive_files_rotate_and_are_valid_gzip(requests_mock, tmp_path):
+    _mock_site(requests_mock)
+
+    with WarcWriter(tmp_path, max_file_size=1) as archive:
+        d = driver.Driver()
+        d.add_response_hook(archive)
+        d.get("http://remote.test/page")
+        d.get("http://remote.test/data")
+
+    assert len(archive.paths) == 2
+    with gzip.open(archive.paths[1]) as f:
+        record = f.read()
+    assert record.startswith(b"WARC/1.1\r\nWARC-Type: response\r\n")
+    assert b'\r\n\r\n{"key": "value"}\r\n\r\n' in record
+
+
+def test_records_are_dated_when_the_response_arrived(requests_mock, tmp_path):
+    requests_mock.get(
+        "http://remote.test/old", status_code=301, headers={"Location": "/page"}
+    )
+    _mock_site(requests_mock)
+    d = driver.Driver()
+    d.get("http://remote.test/old")
+    response = d.last_response.response
+    captured = [r.captured_at for r in response.history + [response]]
+    assert captured == sorted(captured)
+
+    # Archived some time after the response arrived
+    response.captured_at -= datetime.timedelta(hours=1)
+    with WarcWriter(tmp_path) as archive:
+        archive(response)
+
+    reader = WarcReader(archive.paths)
+    dates = [r.headers["WARC-Date"] for r in reader]
+    assert dates[1] == response.captured_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+    assert dates[0] != dates[1]
+    reloaded = reader.raw_response(reader.latest("http://remote.test/page"))
+    assert reloaded.captured_at == response.captured_at.replace(microsecond=0)
+
+
+def test_replayed_responses_keep_their_recorded_date(tmp_path):
+    # The requests_mock fixture would answer the replayed requests itself, so
+    # only its adapter is used, underneath the recording
+    site = requests_mock.Adapter()
+    site.register_uri(
+        "GET",
+        "http://remote.test/page",
+        headers={"Content-Type": "text/html"},
+        text="<html><body><p>recorded</p></body></html>",
+    )
+    tape = tmp_path / "tape"
+    d = driver.Driver()
+    with cassette.RecordingAdapter(tape, adapter=site) as recording:
+        d.session.mount("http://", recording)
+        d.get("http://remote.test/page")
+
+    # Pretend the cassette was recorded a while ago
+    index = tape / "index.jsonl"
+    entry = json.loads(index.read_text())
+    entry["captured"] = 1700000000.0
+    index.write_text(json.dumps(entry) + "\n")
+
+    d = driver.Driver()
+    cassette.replay(d, tape)
+    with WarcWriter(tmp_path / "archive") as archive:
+        d.add_response_hook(archive)
+        assert d.get("http://remote.test/page").p.text() == "recorded"
+
+    (record,) = WarcReader(archive.paths)
+    assert record.headers["WARC-Date"] == "2023-11-14T22:13:20Z"
+
+
+def test_date_header_is_used_when_capture_time_is_unknown(tmp_path):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = "http://remote.test/"
+    response.headers["Date"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    response._content = b"body"
+
+    with WarcWriter(tmp_path) as archive:
+        archive(response)
+
+    (record,) = WarcReader(archive.paths)
+    assert record.headers["WARC-Date"] == "2015-10-21T07:28:00Z"
@@ -1,6 +1,6 @@
 import pytest
 
-from activesoup import driver
+from activesoup import driver, html
 
 
 @pytest.fixture
@@ -40,3 +40,56 @@ def test_can_find_by_id(articles_list_page):
         "https://example.com/article2",
         "https://example.com/article3",
     ]
+
+
+def test_text_content_includes_nested_text(nested_objects_page):
+    content_body = nested_objects_page.find('.//div[@class="content-body"]')
+
+    assert content_body.text_content(separator=" ") == (
+        "Something in the content-body Something nested Something nested 2"
+    )
+
+
+def test_text_contents_of_many_elements(articles_list_page):
+    articles = articles_list_page.find_all('li[@class="article"]')
+
+    assert html.text_contents(articles) == ["article1", "article2", "article3"]
+
+
+def test_find_by_text_returns_innermost_match(articles_list_page):
+    found = articles_list_page.find_by_text("article2")
+
+    assert [f["href"] for f in found] == ["https://example.com/article2"]
+
+
+def test_find_by_text_can_filter_by_tag(articles_list_page):
+    found = articles_list_page.find_by_text("ARTICLE", tag="li")
+
+    assert [f.text_content() for f in found] == ["article1", "article2", "article3"]
+
+
+def test_find_by_text_is_limited_to_the_searched_element(nested_objects_page):
+    spans = nested_objects_page.find_all('span[@class="nested-content"]')
+
+    assert spans[1].find_by_text("something nested", tag="p")[0].text() == (
+        "Something nested 2"
+    )
+    assert nested_objects_page.find_by_text("no such text") == []
+
+
+def test_find_by_text_matches_partial_words_at_the_ends(requests_mock):
+    requests_mock.get(
+        "http://remote.test/",
+        headers={"Content-Type": "text/html"},
+        text="<p>Invoices overdue</p><p>Overdue invoice</p><p>Voice mail</p>",
+    )
+    page = driver.Driver().get("http://remote.test/")
+
+    def found(text):
+        return [p.text() for p in page.find_by_text(text, tag="p")]
+
+    assert found("voices over") == ["Invoices overdue"]
+    assert found("due invo") == ["Overdue invoice"]
+    assert found("oic") == ["Invoices overdue", "Overdue invoice", "Voice mail"]
+    assert found("voice mail") == ["Voice mail"]
+    assert found("ices overdue invoice") == []